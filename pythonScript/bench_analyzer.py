@@ -0,0 +1,478 @@
+"""
+Benchmarks for the stress test analyzer
+"""
+
+import argparse
+import contextlib
+import fnmatch
+import gzip
+import io
+import json
+import lzma
+import os
+import platform
+import py_compile
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import partial
+
+from stress_test_analysis import JSON_BACKENDS, LINE_READERS, METRIC_SETS, StressTestAnalyzer, get_decoder
+from synthetic_logs import MAP_COMPLEXITY, agents_dir, generate_corpus, write_scenario
+
+# Run in a fresh interpreter so ru_maxrss reflects a single reader.
+_READER_CHILD = """
+import json, resource, sys, time
+sys.path.insert(0, {script_dir!r})
+from stress_test_analysis import StressTestAnalyzer
+analyzer = StressTestAnalyzer(reader={reader!r})
+start = time.perf_counter()
+for path in {paths!r}:
+    analyzer.analyze_file(path)
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}))
+"""
+
+
+def _best_of(repeat, func):
+    """Return (best wall time, last result) over ``repeat`` calls of func."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _read_lines(paths):
+    lines = []
+    for path in paths:
+        with open(path, 'r') as f:
+            lines.extend(line.strip() for line in f if line.strip())
+    return lines
+
+
+def bench_decoders(paths, repeat=3):
+    """Records/second for each installed JSON backend, raw decode and full analyze_file."""
+    lines = _read_lines(paths)
+    print(f"{len(lines)} records from {len(paths)} file(s)")
+    print(f"{'backend':<10} {'decode rec/s':>14} {'analyze rec/s':>14}")
+    for backend in JSON_BACKENDS:
+        try:
+            decoder = get_decoder(backend)
+        except ImportError:
+            print(f"{backend:<10} {'not installed':>14}")
+            continue
+
+        def decode_all():
+            loads, error = decoder.loads, decoder.error
+            for line in lines:
+                try:
+                    loads(line)
+                except error:
+                    pass
+
+        analyzer = StressTestAnalyzer(json_backend=backend)
+        decode_time, _ = _best_of(repeat, decode_all)
+        analyze_time, _ = _best_of(repeat, lambda: [analyzer.analyze_file(p) for p in paths])
+        print(f"{backend:<10} {len(lines) / decode_time:>14,.0f} {len(lines) / analyze_time:>14,.0f}")
+
+
+def bench_prefilter(paths, metric_sets=None, repeat=3):
+    """Compare the byte-level prefilter with the full-parse path for the given metric sets."""
+    label = ','.join(sorted(metric_sets or METRIC_SETS))
+    total_bytes = sum(os.path.getsize(p) for p in paths)
+    print(f"{total_bytes / 1e6:.1f} MB in {len(paths)} file(s), metric sets: {label}")
+    print(f"{'mode':<10} {'seconds':>9} {'MB/s':>9}")
+    outputs = {}
+    for prefilter in (False, True):
+        analyzer = StressTestAnalyzer(metric_sets=metric_sets, prefilter=prefilter)
+        elapsed, outputs[prefilter] = _best_of(repeat, lambda: [analyzer.analyze_file(p) for p in paths])
+        mode = 'prefilter' if prefilter else 'full'
+        print(f"{mode:<10} {elapsed:>9.3f} {total_bytes / 1e6 / elapsed:>9.1f}")
+    if outputs[False] != outputs[True]:
+        print("WARNING: prefilter metrics differ from the full parse")
+
+
+def bench_readers(paths, repeat=3):
+    """Peak RSS and throughput of each line reader, each measured in its own process."""
+    total_bytes = sum(os.path.getsize(p) for p in paths)
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    print(f"{total_bytes / 1e6:.1f} MB in {len(paths)} file(s)")
+    print(f"{'reader':<8} {'seconds':>9} {'MB/s':>9} {'peak RSS MB':>12}")
+    for reader in LINE_READERS:
+        code = _READER_CHILD.format(script_dir=script_dir, reader=reader, paths=[os.path.abspath(p) for p in paths])
+        runs = [json.loads(subprocess.run([sys.executable, '-c', code], check=True, capture_output=True,
+                                          text=True).stdout.splitlines()[-1]) for _ in range(repeat)]
+        elapsed = min(run['seconds'] for run in runs)
+        peak_rss = max(run['max_rss_kb'] for run in runs) / 1024
+        print(f"{reader:<8} {elapsed:>9.3f} {total_bytes / 1e6 / elapsed:>9.1f} {peak_rss:>12.1f}")
+
+
+def _compress_zstd(src, dst):
+    try:
+        from compression import zstd
+        compressor = lambda f: zstd.open(f, 'wb')
+    except ImportError:
+        import zstandard
+        compressor = lambda f: zstandard.ZstdCompressor().stream_writer(open(f, 'wb'))
+    with open(src, 'rb') as fin, compressor(dst) as fout:
+        shutil.copyfileobj(fin, fout)
+
+
+def _compress(src, dst, opener):
+    with open(src, 'rb') as fin, opener(dst, 'wb') as fout:
+        shutil.copyfileobj(fin, fout)
+
+
+CODECS = {
+    '.gz': lambda src, dst: _compress(src, dst, gzip.open),
+    '.xz': lambda src, dst: _compress(src, dst, lzma.open),
+    '.zst': _compress_zstd,
+}
+
+
+def bench_codecs(paths, repeat=3):
+    """Throughput of analyze_file on plain logs and their gzip, zstd and xz compressed copies."""
+    total_bytes = sum(os.path.getsize(p) for p in paths)
+    print(f"{total_bytes / 1e6:.1f} MB uncompressed in {len(paths)} file(s)")
+    print(f"{'codec':<6} {'ratio':>6} {'seconds':>9} {'MB/s':>9}")
+    analyzer = StressTestAnalyzer()
+    with tempfile.TemporaryDirectory() as tmp:
+        for suffix in ('',) + tuple(CODECS):
+            if suffix:
+                targets = [os.path.join(tmp, f"{i}-{os.path.basename(p)}{suffix}") for i, p in enumerate(paths)]
+                try:
+                    for src, dst in zip(paths, targets):
+                        CODECS[suffix](src, dst)
+                except ImportError:
+                    print(f"{suffix[1:]:<6} {'not installed':>16}")
+                    continue
+            else:
+                targets = paths
+            ratio = total_bytes / sum(os.path.getsize(t) for t in targets)
+            elapsed, _ = _best_of(repeat, lambda: [analyzer.analyze_file(t) for t in targets])
+            print(f"{suffix[1:] or 'plain':<6} {ratio:>6.1f} {elapsed:>9.3f} {total_bytes / 1e6 / elapsed:>9.1f}")
+
+
+# Modules the analysis path must not import at startup.
+HEAVY_MODULES = ('numpy', 'pandas', 'seaborn', 'matplotlib', 'scipy', 'pyarrow')
+
+
+def _import_times(code, script_dir):
+    """Run code under ``python -X importtime``; return ({module: cumulative microseconds}, stdout)."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], check=True, capture_output=True,
+                          text=True, cwd=script_dir)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        times[name] = int(cumulative)
+    return times, proc.stdout
+
+
+# Child for bench_startup: time importing the module plus a full CLI run.
+_STARTUP_CHILD = """
+import time
+start = time.perf_counter()
+import stress_test_analysis
+imported = time.perf_counter()
+stress_test_analysis.main({argv!r})
+print('startup', imported - start, time.perf_counter() - start)
+"""
+
+
+def bench_startup(budget_ms=100.0, repeat=5):
+    """Cost of ``stress-analyze`` on a one-file corpus against a budget.
+
+    Returns False if the run (import plus analysis and CSV output) is over
+    budget or any heavy module gets imported along the way.
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    # Measure an installed-style start from bytecode, even under PYTHONDONTWRITEBYTECODE.
+    py_compile.compile(os.path.join(script_dir, 'stress_test_analysis.py'))
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, 'Stree_Simulation', 'EasyMap', 'TwoAgents')
+        os.makedirs(directory)
+        write_scenario(os.path.join(directory, 'scenario_json_outputs-startup.json'), agents=2, steps=50, seed=1)
+        code = _STARTUP_CHILD.format(argv=[tmp, '-o', os.path.join(tmp, 'detailed_results.csv')])
+        runs = []
+        for _ in range(repeat):
+            times, stdout = _import_times(code, script_dir)
+            import_s, total_s = map(float, stdout.splitlines()[-1].split()[1:])
+            runs.append((total_s, import_s, times))
+    total_s, import_s, best = min(runs, key=lambda run: run[0])
+    total_ms = total_s * 1000
+    print(f"stress-analyze on a one-file corpus: {total_ms:.1f} ms, of which import {import_s * 1000:.1f} ms "
+          f"(budget {budget_ms:.0f} ms, best of {repeat})")
+    print("slowest imports:")
+    for name, us in sorted(best.items(), key=lambda item: -item[1])[:8]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+    heavy = sorted({name.split('.')[0] for name in best} & set(HEAVY_MODULES))
+    if heavy:
+        print(f"FAIL: heavy modules imported on the CLI path: {', '.join(heavy)}")
+    if total_ms > budget_ms:
+        print("FAIL: startup over budget")
+    return not heavy and total_ms <= budget_ms
+
+
+def _analyze_file_case(path):
+    analyzer = StressTestAnalyzer()
+    return lambda: analyzer.analyze_file(path), os.path.getsize(path) / 1e6, 'MB/s'
+
+
+def _analyze_all_case(root):
+    def run():
+        analyzer = StressTestAnalyzer(root)
+        analyzer.analyze_all_files()
+        return analyzer
+    files = sum(len(names) for _, _, names in os.walk(root))
+    return run, files, 'files/s'
+
+
+def _many_runs_analyzer(root, runs):
+    """An analyzer holding ``runs`` run-table rows and aggregates, cycling over the corpus results under root."""
+    source = StressTestAnalyzer(root)
+    source.analyze_all_files()
+    columns = source._run_columns
+    template = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    analyzer = StressTestAnalyzer(root)
+    for i in range(runs):
+        row = template[i % len(template)]
+        analyzer._aggregate_run(row)
+        analyzer._append_run_row(row)
+    return analyzer
+
+
+def _suite_cases(tmp):
+    """Build the suite inputs under tmp; map case name to a (func, work units, unit) factory."""
+    sizes = {'small': 800, 'medium': 8000, 'huge': 80000}
+    cases = {}
+    for name, steps in sizes.items():
+        path = os.path.join(tmp, f"{name}.json")
+        cases[f"analyze_file[{name}]"] = lambda path=path, steps=steps: (
+            write_scenario(path, 'MediumMap', 3, steps, malformed_rate=0.001, seed=1), _analyze_file_case(path))[1]
+    root = os.path.join(tmp, 'corpus')
+
+    def corpus():
+        if not os.path.exists(root):
+            generate_corpus(root)
+        return root
+
+    cases['analyze_all_files[3x4]'] = lambda: _analyze_all_case(corpus())
+
+    def aggregate_case():
+        analyzer = _many_runs_analyzer(corpus(), 10000)
+        return partial(analyzer.calculate_aggregate_metrics, confidence=0.95), 10000, 'runs/s'
+
+    def save_case():
+        analyzer = _many_runs_analyzer(corpus(), 10000)
+        return lambda: analyzer.save_detailed_results(os.path.join(tmp, 'results.csv')), 10000, 'runs/s'
+
+    def bootstrap_case():
+        analyzer = _many_runs_analyzer(corpus(), 36)
+        return partial(analyzer.calculate_aggregate_metrics, confidence=0.95, bootstrap=10000), 36, 'runs/s'
+
+    cases['calculate_aggregate_metrics[10k, confidence]'] = aggregate_case
+    cases['calculate_aggregate_metrics[3x4, bootstrap 10k]'] = bootstrap_case
+    cases['save_detailed_results[10k]'] = save_case
+    return cases
+
+
+def _select_cases(names, only):
+    """The names matching any pattern in only (all names if only is empty), exactly or else as a glob."""
+    if not only:
+        return list(names)
+    return [name for name in names
+            if any(name == pattern or fnmatch.fnmatchcase(name, pattern) for pattern in only)]
+
+
+def bench_suite(repeat=3, only=None, baseline=None, save_baseline=None, threshold=0.1):
+    """Time the analyzer hot paths on synthetic inputs and gate on throughput against a JSON baseline.
+
+    Returns False if any case is more than ``threshold`` (a fraction)
+    slower than its baseline throughput, if an ``only`` pattern selects no
+    case, or if a selected baseline case did not run. Case names contain
+    brackets, so a pattern equal to a name selects it before the pattern is
+    tried as a glob.
+    """
+    previous = {}
+    if baseline:
+        with open(baseline) as f:
+            previous = json.load(f)['cases']
+    results = {}
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = _suite_cases(tmp)
+        unmatched = [pattern for pattern in only or () if not _select_cases(cases, [pattern])]
+        if unmatched:
+            print(f"FAIL: no suite case matches {', '.join(unmatched)}; cases are: {', '.join(cases)}")
+            return False
+        print(f"{'case':<48} {'seconds':>9} {'throughput':>16} {'baseline':>16} {'change':>8}")
+        for name in _select_cases(cases, only):
+            make_case = cases[name]
+            # The analyzer reports progress on stdout; keep the table readable.
+            with contextlib.redirect_stdout(io.StringIO()):
+                func, work, unit = make_case()
+                func()  # warm-up: lazy imports and first-touch costs
+                elapsed, _ = _best_of(repeat, func)
+            throughput = work / elapsed
+            results[name] = {'seconds': elapsed, 'throughput': throughput, 'unit': unit}
+            line = f"{name:<48} {elapsed:>9.3f} {throughput:>11,.1f} {unit:<4}"
+            if name in previous:
+                change = throughput / previous[name]['throughput'] - 1
+                regressed = change < -threshold
+                ok = ok and not regressed
+                line += f" {previous[name]['throughput']:>11,.1f} {unit:<4} {change:>+7.1%}{' REGRESSED' if regressed else ''}"
+            print(line)
+    if save_baseline:
+        with open(save_baseline, 'w') as f:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'repeat': repeat,
+                       'cases': results}, f, indent=2)
+        print(f"Baseline saved to {save_baseline}")
+    if not ok:
+        print(f"FAIL: throughput regressed by more than {threshold:.0%}")
+    missing = [name for name in _select_cases(previous, only) if name not in results]
+    if missing:
+        print(f"FAIL: baseline case(s) did not run: {', '.join(missing)}")
+        ok = False
+    return ok
+
+
+def _scaling_inputs(tmp, root, agent_counts, steps):
+    """(complexity, agent directory, path) per log: every file under root, or one synthetic log per cell."""
+    if root:
+        base = os.path.join(root, 'Stree_Simulation')
+        for complexity in sorted(os.listdir(base)):
+            for agent_count in sorted(os.listdir(os.path.join(base, complexity))):
+                directory = os.path.join(base, complexity, agent_count)
+                for name in sorted(os.listdir(directory)):
+                    yield complexity, agent_count, os.path.join(directory, name)
+        return
+    for complexity in MAP_COMPLEXITY:
+        for count in agent_counts:
+            path = os.path.join(tmp, f"{complexity}-{count}.json")
+            write_scenario(path, complexity, count, steps, seed=count)
+            yield complexity, agents_dir(count), path
+
+
+def bench_scaling(agent_counts=(2, 3, 4, 5, 10, 20, 50), steps=800, root=None, repeat=3, output=None):
+    """Analysis time and peak traced memory per log along the complexity and agent-count axes.
+
+    Prints a table and a least-squares fit of time and memory against the
+    number of log records, plus the log-log slope of time against agent
+    count per complexity, so the cost of a larger sweep can be predicted.
+    """
+    import numpy as np
+    rows = []
+    print(f"{'complexity':<10} {'agents':<12} {'MB':>7} {'records':>8} {'seconds':>8} {'us/record':>10} "
+          f"{'peak MB':>8} {'B/record':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for complexity, agent_count, path in _scaling_inputs(tmp, root, agent_counts, steps):
+            counter = StressTestAnalyzer(instrument=True)
+            metrics = counter.analyze_file(path)
+            if metrics is None:
+                continue
+            records = counter.file_stats[0]['records']
+            analyzer = StressTestAnalyzer()
+            elapsed, _ = _best_of(repeat, lambda: analyzer.analyze_file(path))
+            tracemalloc.start()
+            analyzer.analyze_file(path)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            row = {'complexity': complexity, 'agent_count': agent_count, 'agents': len(metrics['agent_steps']),
+                   'bytes': os.path.getsize(path), 'records': records, 'seconds': elapsed, 'peak_bytes': peak}
+            rows.append(row)
+            print(f"{complexity:<10} {agent_count:<12} {row['bytes'] / 1e6:>7.2f} {records:>8} {elapsed:>8.3f} "
+                  f"{elapsed / records * 1e6:>10.2f} {peak / 1e6:>8.2f} {peak / records:>9.1f}")
+
+    records = np.array([row['records'] for row in rows], dtype=float)
+    time_fit = np.polyfit(records, [row['seconds'] for row in rows], 1)
+    memory_fit = np.polyfit(records, [row['peak_bytes'] for row in rows], 1)
+    print(f"\ntime   ~ {time_fit[0] * 1e6:.3f} us/record * records {time_fit[1] * 1e3:+.2f} ms")
+    print(f"memory ~ {memory_fit[0]:.1f} B/record * records {memory_fit[1] / 1e6:+.2f} MB")
+    exponents = {}
+    for complexity in dict.fromkeys(row['complexity'] for row in rows):
+        cells = [row for row in rows if row['complexity'] == complexity]
+        if len({row['agents'] for row in cells}) > 1:
+            exponents[complexity] = np.polyfit(np.log([row['agents'] for row in cells]),
+                                               np.log([row['seconds'] for row in cells]), 1)[0]
+            print(f"{complexity}: time grows as agents^{exponents[complexity]:.2f}")
+    if output:
+        fit = {'time_seconds_per_record': time_fit[0], 'time_intercept_seconds': time_fit[1],
+               'peak_bytes_per_record': memory_fit[0], 'peak_intercept_bytes': memory_fit[1],
+               'agent_exponents': exponents}
+        with open(output, 'w') as f:
+            json.dump({'rows': rows, 'fit': {key: value if isinstance(value, dict) else float(value)
+                                             for key, value in fit.items()}}, f, indent=2, default=float)
+        print(f"Scaling table saved to {output}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the stress test analyzer.")
+    parser.add_argument('--repeat', type=int, default=3, help="repetitions per measurement (best is reported)")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('decoders', help="compare JSON decoder backends")
+    p.add_argument('paths', nargs='+', help="scenario log files")
+
+    p = sub.add_parser('prefilter', help="compare the byte-level prefilter with a full parse")
+    p.add_argument('paths', nargs='+', help="scenario log files")
+    p.add_argument('--metrics', help="comma-separated metric sets (default: all)")
+
+    p = sub.add_parser('readers', help="compare peak RSS and throughput of the text and mmap line readers")
+    p.add_argument('paths', nargs='+', help="scenario log files")
+
+    p = sub.add_parser('codecs', help="compare analysis throughput on plain and compressed logs")
+    p.add_argument('paths', nargs='+', help="plain scenario log files to compress and analyze")
+
+    p = sub.add_parser('startup', help="check a one-file stress-analyze run against a time budget and for heavy "
+                                       "imports")
+    p.add_argument('--budget-ms', type=float, default=100.0,
+                   help="maximum time for import plus the one-file run, in ms (default: 100)")
+
+    p = sub.add_parser('suite', help="time analyze_file, analyze_all_files, aggregation and saving on synthetic "
+                                     "logs, optionally gating against a baseline")
+    p.add_argument('--only', action='append', metavar='PATTERN',
+                   help="run only this case, or cases matching this glob, e.g. 'analyze_file[small]' or "
+                        "'analyze_file*' (repeatable)")
+    p.add_argument('--baseline', help="JSON baseline to compare against; exit 1 on regression")
+    p.add_argument('--save-baseline', metavar='PATH', help="write this run's results as a JSON baseline")
+    p.add_argument('--threshold', type=float, default=0.1,
+                   help="allowed throughput drop against the baseline, as a fraction (default: 0.1)")
+
+    p = sub.add_parser('scaling', help="measure time and peak memory per log across map complexity and agent "
+                                       "count, and fit a cost curve")
+    p.add_argument('--agents', nargs='+', type=int, default=[2, 3, 4, 5, 10, 20, 50],
+                   help="agent counts to generate (default: 2 3 4 5 10 20 50)")
+    p.add_argument('--steps', type=int, default=800, help="ticks per synthetic log (default: 800)")
+    p.add_argument('--root', help="measure the logs of an existing corpus root instead of generating them")
+    p.add_argument('-o', '--output', help="write the table and fit as JSON")
+
+    args = parser.parse_args()
+    if args.command == 'decoders':
+        bench_decoders(args.paths, args.repeat)
+    elif args.command == 'prefilter':
+        bench_prefilter(args.paths, args.metrics.split(',') if args.metrics else None, args.repeat)
+    elif args.command == 'readers':
+        bench_readers(args.paths, args.repeat)
+    elif args.command == 'codecs':
+        bench_codecs(args.paths, args.repeat)
+    elif args.command == 'startup':
+        if not bench_startup(args.budget_ms, args.repeat):
+            sys.exit(1)
+    elif args.command == 'scaling':
+        bench_scaling(args.agents, args.steps, args.root, args.repeat, args.output)
+    elif args.command == 'suite':
+        if not bench_suite(args.repeat, args.only, args.baseline, args.save_baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,151 +1,1335 @@
 """
 Stress Test Analysis Script for Scalability Evaluation
+
+numpy, pandas, sqlite3, the compression codecs and the process pool are
+imported where they are used, so per-file invocations only pay for what
+they touch; analyzing a corpus and writing the CSV or JSON summary loads
+neither numpy nor pandas.
 """
 
+import argparse
+import fnmatch
+import hashlib
+import io
 import json
+import math
+import mmap
 import os
-import pandas as pd
-import numpy as np
-from collections import defaultdict, Counter
-import seaborn as sns
+import re
+import time
+from array import array
+from functools import partial, reduce
+from collections import defaultdict
 from pathlib import Path
 
+# Bump whenever a change to analyze_file alters the metrics it produces, so
+# cached results from older versions are recomputed.
+ANALYZER_VERSION = 2
+
+JSON_BACKENDS = ('orjson', 'msgspec', 'json')
+
+LINE_READERS = ('text', 'mmap')
+
+OUTPUT_FORMATS = ('csv', 'json', 'parquet')
+
+# Formats for the partitioned per-run datasets written by save_columnar.
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+
+# Scenario log file patterns picked up in each configuration directory.
+LOG_PATTERNS = ('*.json', '*.json.gz', '*.json.zst', '*.json.xz')
+
+
+class JsonDecoder:
+    """A JSON backend: ``loads`` accepts str or bytes, ``error`` is what it raises on bad input."""
+
+    def __init__(self, name, loads, error):
+        self.name = name
+        self.loads = loads
+        self.error = error
+
+    def __repr__(self):
+        return f"JsonDecoder({self.name!r})"
+
+
+def get_decoder(backend='auto'):
+    """Return a JsonDecoder for ``backend``.
+
+    ``'auto'`` picks the first installed of orjson, msgspec and the stdlib
+    ``json`` module. orjson and msgspec reject the non-standard ``NaN`` and
+    ``Infinity`` literals that ``json`` accepts; such lines are skipped like
+    any other malformed line.
+    """
+    candidates = JSON_BACKENDS if backend == 'auto' else (backend,)
+    for name in candidates:
+        if name == 'orjson':
+            try:
+                import orjson
+            except ImportError:
+                continue
+            return JsonDecoder('orjson', orjson.loads, orjson.JSONDecodeError)
+        if name == 'msgspec':
+            try:
+                import msgspec
+            except ImportError:
+                continue
+            return JsonDecoder('msgspec', msgspec.json.Decoder().decode, msgspec.DecodeError)
+        if name == 'json':
+            return JsonDecoder('json', json.loads, json.JSONDecodeError)
+        raise ValueError(f"Unknown JSON backend: {name!r} (expected one of {', '.join(JSON_BACKENDS)})")
+    raise ImportError(f"JSON backend {backend!r} is not installed")
+
+
+# Metric sets that can be enabled independently, and the raw key tokens a line
+# must contain for it to affect that set.
+METRIC_SETS = {
+    'steps': (b'"time"',),
+    'rescues': (b'"total rescues"',),
+    'rooms': (b'"room_descriptions"',),
+    'agents': (b'"command"',),
+    'visits': (b'"parsed_response"',),
+    'communications': (b'"parsed_response"', b'"action_result"'),
+}
+
+
+def _file_digest(filepath, chunk_size=1 << 20):
+    """SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class RunningStats:
+    """Streaming count/mean/M2 accumulator (Welford), mergeable across workers."""
+
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other):
+        """Fold another accumulator into this one (Chan et al. parallel update)."""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        return self
+
+    @property
+    def std(self):
+        """Population standard deviation, matching ``np.std``."""
+        return (self.m2 / self.count) ** 0.5 if self.count else float('nan')
+
+    def __repr__(self):
+        return f"RunningStats(count={self.count}, mean={self.mean!r}, m2={self.m2!r})"
+
+
+# Per-run values aggregated for each configuration: output name -> metrics key.
+AGGREGATE_METRICS = {
+    'total_steps': 'total_steps',
+    'total_rescues': 'total_rescues',
+    'unique_rooms': 'unique_rooms_count',
+    'simulation_time': 'final_time',
+    'total_communications': 'total_communications',
+    'communication_attempts_per_agent': 'communication_attempts_per_agent',
+}
+
+# Aggregates reported with a standard deviation as well as a mean.
+STD_METRICS = ('total_steps', 'total_rescues', 'unique_rooms', 'simulation_time', 'total_communications')
+
+
+def _beta_cf(a, b, x):
+    """Continued fraction for the regularized incomplete beta function (modified Lentz)."""
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 300):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            h *= d * c
+        if abs(d * c - 1.0) < 1e-15:
+            break
+    return h
+
+
+def _beta_inc(a, b, x):
+    """Regularized incomplete beta function I_x(a, b)."""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x))
+    if x < (a + 1) / (a + b + 2):
+        return front * _beta_cf(a, b, x) / a
+    return 1.0 - front * _beta_cf(b, a, 1.0 - x) / b
+
+
+def t_quantile(q, df):
+    """Quantile of Student's t distribution, via scipy when installed.
+
+    The fallback bisects the two-sided tail probability ``I_x(df/2, 1/2)``
+    over ``x = df / (df + t**2)``.
+    """
+    try:
+        from scipy.stats import t
+        return float(t.ppf(q, df))
+    except ImportError:
+        pass
+    if q == 0.5:
+        return 0.0
+    target = 2 * min(q, 1 - q)
+    lo, hi = 0.0, 1.0
+    for _ in range(200):
+        mid = (lo + hi) / 2
+        if _beta_inc(df / 2, 0.5, mid) < target:
+            lo = mid
+        else:
+            hi = mid
+    x = (lo + hi) / 2
+    value = math.sqrt(df * (1 - x) / x)
+    return value if q > 0.5 else -value
+
+
+def describe_runs(values, confidence=0.95, quantiles=(0.25, 0.75), bootstrap=0, seed=0):
+    """Summary statistics of a runs x metrics array, one array per statistic, each computed for all metrics at once.
+
+    Returns medians, the requested quantiles, standard errors, the
+    t-based confidence interval of the mean and, with ``bootstrap``
+    resamples, a percentile bootstrap interval of the mean. Resampled
+    means are computed as resample-count matrices times the runs, in
+    blocks that bound memory for large configurations.
+    """
+    import numpy as np
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    alpha = 1 - confidence
+    mean = values.mean(axis=0)
+    stats = {'median': np.median(values, axis=0)}
+    for q, row in zip(quantiles, np.quantile(values, quantiles, axis=0)):
+        stats[f"q{q * 100:g}"] = row
+    nan = np.full(values.shape[1], np.nan)
+    if n > 1:
+        stats['se'] = values.std(axis=0, ddof=1) / np.sqrt(n)
+        margin = t_quantile(1 - alpha / 2, n - 1) * stats['se']
+        stats['ci_low'], stats['ci_high'] = mean - margin, mean + margin
+    else:
+        stats['se'], stats['ci_low'], stats['ci_high'] = nan, nan, nan
+    if bootstrap:
+        rng = np.random.default_rng(seed)
+        block = max(1, min(bootstrap, 4_000_000 // max(n, 1)))
+        means = []
+        for start in range(0, bootstrap, block):
+            size = min(block, bootstrap - start)
+            picks = rng.integers(0, n, size=(size, n)) + np.arange(0, size * n, n)[:, None]
+            counts = np.bincount(picks.ravel(), minlength=size * n).reshape(size, n)
+            means.append(counts @ values / n)
+        means = np.concatenate(means)
+        stats['boot_low'], stats['boot_high'] = np.quantile(means, [alpha / 2, 1 - alpha / 2], axis=0)
+    return stats
+
+
+class SymbolTable:
+    """Interns names to small consecutive integers, stable for the life of the table."""
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def intern(self, name):
+        symbol = self.ids.get(name)
+        if symbol is None:
+            symbol = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return symbol
+
+    def __len__(self):
+        return len(self.names)
+
+
+class VisitMatrix:
+    """Per-run room visit counts: an agents x rooms count matrix plus the interned ids of its rows and columns.
+
+    Ids and counts (row-major) are stdlib ``array('i')`` buffers, so
+    retaining runs does not import numpy; matrix() views the counts as a
+    NumPy array when one is needed.
+    """
+
+    __slots__ = ('agent_ids', 'room_ids', 'counts')
+
+    def __init__(self, agent_ids, room_ids, counts):
+        self.agent_ids = agent_ids
+        self.room_ids = room_ids
+        self.counts = counts
+
+    @classmethod
+    def from_dict(cls, visits, agents, rooms):
+        """Build from ``{agent: {room: count}}``, interning names into the agents and rooms tables."""
+        agent_ids = array('i', (agents.intern(a) for a in visits))
+        columns = {}
+        for room_counts in visits.values():
+            for room in room_counts:
+                columns.setdefault(room, len(columns))
+        width = len(columns)
+        counts = array('i', bytes(4 * len(visits) * width))
+        for row, room_counts in enumerate(visits.values()):
+            for room, count in room_counts.items():
+                counts[row * width + columns[room]] = count
+        room_ids = array('i', (rooms.intern(r) for r in columns))
+        return cls(agent_ids, room_ids, counts)
+
+    def to_dict(self, agents, rooms):
+        """Inverse of from_dict, resolving ids through the symbol tables."""
+        width = len(self.room_ids)
+        return {
+            agents.names[a]: {rooms.names[r]: c for r, c in zip(self.room_ids, self.counts[i * width:(i + 1) * width])
+                              if c}
+            for i, a in enumerate(self.agent_ids)
+        }
+
+    def matrix(self):
+        """The counts as an agents x rooms NumPy array (a view, not a copy)."""
+        import numpy as np
+        return np.frombuffer(self.counts, dtype=np.int32).reshape(len(self.agent_ids), len(self.room_ids))
+
+    def dense(self, num_agents, num_rooms):
+        """Counts scattered into a corpus-wide num_agents x num_rooms matrix."""
+        import numpy as np
+        out = np.zeros((num_agents, num_rooms), dtype=np.int32)
+        out[np.ix_(self.agent_ids, self.room_ids)] = self.matrix()
+        return out
+
+    def __repr__(self):
+        return f"VisitMatrix({len(self.agent_ids)} agents x {len(self.room_ids)} rooms, {sum(self.counts)} visits)"
+
+
+def rooms_bitset(rooms, table):
+    """Encode an iterable of room names as an int bitset over table ids."""
+    bits = 0
+    for room in rooms:
+        bits |= 1 << table.intern(room)
+    return bits
+
+
+def bitset_members(bits, table):
+    """Room names whose bits are set."""
+    return [table.names[i] for i in range(bits.bit_length()) if bits >> i & 1]
+
+
+class MetricsCache:
+    """SQLite store of analyze_file results keyed by file path, size, mtime and content hash.
+
+    A stored entry is reused when the file's size and mtime are unchanged,
+    or when only the mtime changed but the SHA-256 of the contents still
+    matches. Entries written under a different ``version`` key are ignored.
+
+    Storing an entry hashes the whole file, i.e. one extra sequential read
+    per cache miss on top of the analysis itself; a digest already
+    computed by lookup() for the same file is reused.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        import sqlite3
+        self.conn = sqlite3.connect(self.cache_dir / 'metrics.sqlite')
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS file_metrics ('
+            ' path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,'
+            ' sha256 TEXT, version TEXT, metrics TEXT)'
+        )
+        self.hits = 0
+        self.misses = 0
+        self._digests = {}
+
+    def lookup(self, filepath, version):
+        """Return True if a fresh entry exists for filepath, counting a hit or miss."""
+        key = str(Path(filepath).resolve())
+        row = self.conn.execute(
+            'SELECT size, mtime_ns, sha256, version FROM file_metrics WHERE path = ?', (key,)
+        ).fetchone()
+        st = os.stat(filepath)
+        if row is not None and row[3] == version and row[0] == st.st_size:
+            if row[1] == st.st_mtime_ns:
+                self.hits += 1
+                return True
+            digest = _file_digest(filepath)
+            if row[2] == digest:
+                with self.conn:
+                    self.conn.execute('UPDATE file_metrics SET mtime_ns = ? WHERE path = ?', (st.st_mtime_ns, key))
+                self.hits += 1
+                return True
+            self._digests[key] = digest
+        self.misses += 1
+        return False
+
+    def load(self, filepath):
+        """Return the stored metrics for filepath; call after a successful lookup()."""
+        row = self.conn.execute(
+            'SELECT metrics FROM file_metrics WHERE path = ?', (str(Path(filepath).resolve()),)
+        ).fetchone()
+        return json.loads(row[0])
+
+    def get(self, filepath, version):
+        """Return cached metrics for filepath, or None on a miss."""
+        return self.load(filepath) if self.lookup(filepath, version) else None
+
+    def put(self, filepath, version, metrics):
+        """Store metrics for filepath under its current fingerprint."""
+        key = str(Path(filepath).resolve())
+        st = os.stat(filepath)
+        digest = self._digests.pop(key, None) or _file_digest(filepath)
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO file_metrics VALUES (?, ?, ?, ?, ?, ?)',
+                (key, st.st_size, st.st_mtime_ns, digest, version, json.dumps(metrics)),
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+def _iter_file_lines(filepath, mode='r'):
+    with open(filepath, mode) as f:
+        yield from f
+
+
+def _open_zstd(filepath):
+    """Open a zstd-compressed file for streaming binary reads."""
+    try:
+        from compression import zstd
+    except ImportError:
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("reading .zst logs requires the 'zstandard' package") from None
+        raw = open(filepath, 'rb')
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True))
+    return zstd.open(filepath, 'rb')
+
+
+def _open_gzip(filepath):
+    import gzip
+    return gzip.open(filepath, 'rb')
+
+
+def _open_xz(filepath):
+    import lzma
+    return lzma.open(filepath, 'rb')
+
+
+COMPRESSED_OPENERS = {
+    '.gz': _open_gzip,
+    '.xz': _open_xz,
+    '.zst': _open_zstd,
+}
+
+
+def _compression_opener(filepath):
+    """Return the opener for a compressed log, or None for plain files."""
+    return COMPRESSED_OPENERS.get(os.path.splitext(str(filepath))[1])
+
+
+def _iter_compressed_lines(filepath, opener):
+    with opener(filepath) as f:
+        yield from f
+
+
+def _line_aligned_ranges(filepath, chunk_size):
+    """Split filepath into (start, end) byte ranges of about chunk_size that begin at line starts."""
+    size = os.path.getsize(filepath)
+    bounds = [0]
+    with open(filepath, 'rb') as f:
+        pos = chunk_size
+        while pos < size:
+            f.seek(pos)
+            f.readline()
+            pos = f.tell()
+            if pos >= size:
+                break
+            bounds.append(pos)
+            pos += chunk_size
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _iter_mmap_lines(filepath, start=0, end=None, window=1 << 24):
+    """Yield each line of filepath in [start, end) as bytes sliced from a read-only memory map.
+
+    Pages behind the read position are released every ``window`` bytes so
+    the mapped file does not accumulate in the process's resident set.
+    """
+    with open(filepath, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size if end is None else end
+        if size <= start:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            release = getattr(mm, 'madvise', None)
+            if release is not None and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            if not hasattr(mmap, 'MADV_DONTNEED'):
+                release = None
+            find = mm.find
+            released = start - start % mmap.PAGESIZE
+            while start < size:
+                line_end = find(b'\n', start, size)
+                if line_end < 0:
+                    line_end = size
+                yield mm[start:line_end]
+                start = line_end + 1
+                if release is not None and start - released >= window:
+                    boundary = start - start % mmap.PAGESIZE
+                    release(mmap.MADV_DONTNEED, released, boundary - released)
+                    released = boundary
+
+
+def _is_scalar(value):
+    return isinstance(value, (int, float, str)) or value is None
+
+
+# Methods timed by an instrumented analyzer, and the report column each one adds to.
+TIMED_STAGES = {
+    '_decode_response': 'response_decode_seconds',
+    '_extract_time': 'extract_time_seconds',
+    '_extract_world_state': 'extract_world_state_seconds',
+    '_extract_visits': 'extract_visits_seconds',
+    '_extract_communication': 'extract_communication_seconds',
+    '_extract_action_result': 'extract_action_result_seconds',
+}
+FILE_STATS_COUNTERS = ('bytes_read', 'lines_read', 'lines_prefiltered', 'lines_skipped', 'records', 'chunks')
+FILE_STATS_TIMERS = ('wall_seconds', 'read_seconds', 'decode_seconds', 'record_seconds') + tuple(TIMED_STAGES.values())
+
+
+def _new_file_stats(filepath, bytes_read):
+    """Empty instrumentation record for one file (or one chunk of it)."""
+    stats = {'file_path': str(filepath)}
+    stats.update(dict.fromkeys(FILE_STATS_COUNTERS, 0))
+    stats.update(dict.fromkeys(FILE_STATS_TIMERS, 0.0))
+    stats['bytes_read'] = bytes_read
+    stats['chunks'] = 1
+    return stats
+
+
+def _merge_file_stats(stats, later):
+    for key in FILE_STATS_COUNTERS + FILE_STATS_TIMERS:
+        stats[key] += later[key]
+    return stats
+
+
+def _timed(func, stats, key):
+    """Wrap func so the time spent in it is added to stats[key]."""
+    clock = time.perf_counter
+
+    def timed(*args):
+        start = clock()
+        try:
+            return func(*args)
+        finally:
+            stats[key] += clock() - start
+    return timed
+
+
+def _fingerprint(filepath):
+    st = os.stat(filepath)
+    return [st.st_size, st.st_mtime_ns]
+
+
+class AnalysisCheckpoint:
+    """On-disk progress of an analyze_all_files run, so a killed job can resume.
+
+    Each finished file is appended to ``completed.jsonl`` with its size,
+    mtime and metrics. The file being analyzed serially has its consumed
+    byte offset and partial metrics state in ``in_progress.json``,
+    replaced atomically on every save. Every entry carries ``version``, the
+    analyzer's cache version, so results produced with other metric sets,
+    decoder or event mode are not reused; entries whose file has changed
+    since are ignored as well.
+    """
+
+    def __init__(self, directory, version):
+        self.directory = Path(directory)
+        self.version = version
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.completed_path = self.directory / 'completed.jsonl'
+        self.progress_path = self.directory / 'in_progress.json'
+        self.completed = {}
+        if self.completed_path.exists():
+            with open(self.completed_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final line from a killed run
+                    if entry.get('version') == version:
+                        self.completed[entry['path']] = entry
+        self.in_progress = None
+        if self.progress_path.exists():
+            with open(self.progress_path) as f:
+                self.in_progress = json.load(f)
+            if self.in_progress.get('version') != version:
+                self.in_progress = None
+        self._log = open(self.completed_path, 'a')
+
+    def lookup(self, filepath):
+        """Return (True, metrics) if filepath finished unchanged in an earlier run, else (False, None)."""
+        entry = self.completed.get(str(Path(filepath).resolve()))
+        if entry is not None and entry['fingerprint'] == _fingerprint(filepath):
+            return True, entry['metrics']
+        return False, None
+
+    def record(self, filepath, metrics):
+        """Append a finished file's metrics (None for a failed file)."""
+        key = str(Path(filepath).resolve())
+        self._log.write(json.dumps({'path': key, 'version': self.version, 'fingerprint': _fingerprint(filepath),
+                                    'metrics': metrics}) + '\n')
+        self._log.flush()
+
+    def resume_point(self, filepath):
+        """Return (offset, state) saved for filepath, or None if it was not in progress or has changed."""
+        saved = self.in_progress
+        if (saved is None or saved['path'] != str(Path(filepath).resolve())
+                or saved['fingerprint'] != _fingerprint(filepath)):
+            return None
+        return saved['offset'], saved['state']
+
+    def save_progress(self, filepath, offset, state):
+        """Atomically record the consumed offset and partial state of the file in progress."""
+        tmp = self.progress_path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'path': str(Path(filepath).resolve()), 'version': self.version,
+                       'fingerprint': _fingerprint(filepath), 'offset': offset, 'state': state}, f)
+        os.replace(tmp, self.progress_path)
+
+    def clear(self):
+        """Remove the checkpoint after a run has finished."""
+        self._log.close()
+        for path in (self.completed_path, self.progress_path, self.progress_path.with_suffix('.tmp')):
+            if path.exists():
+                path.unlink()
+
+
+class JsonlEventSink:
+    """Communication events written as JSON lines, one file per analyzed log, in a directory."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _target(self, filepath):
+        key = str(Path(filepath).resolve())
+        return self.directory / f"{Path(filepath).name}.{hashlib.sha1(key.encode()).hexdigest()[:8]}.jsonl"
+
+    def write(self, filepath, events):
+        """Replace the stored events of filepath."""
+        key = str(Path(filepath).resolve())
+        with open(self._target(filepath), 'w') as f:
+            for event in events:
+                f.write(json.dumps({'file': key, **event}) + '\n')
+
+    def read(self, filepath=None):
+        """Yield stored events, for one log or for all of them."""
+        targets = [self._target(filepath)] if filepath is not None else sorted(self.directory.glob('*.jsonl'))
+        for target in targets:
+            if target.exists():
+                with open(target) as f:
+                    for line in f:
+                        yield json.loads(line)
+
+    def close(self):
+        pass
+
+
+class SqliteEventSink:
+    """Communication events stored in a SQLite ``communication_events`` table keyed by file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        import sqlite3
+        self.conn = sqlite3.connect(self.path, timeout=60)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS communication_events '
+                              '(file TEXT, time REAL, agent TEXT, role TEXT, targets TEXT)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS communication_events_file ON communication_events (file)')
+
+    def write(self, filepath, events):
+        """Replace the stored events of filepath in one transaction."""
+        key = str(Path(filepath).resolve())
+        with self.conn:
+            self.conn.execute('DELETE FROM communication_events WHERE file = ?', (key,))
+            self.conn.executemany(
+                'INSERT INTO communication_events VALUES (?, ?, ?, ?, ?)',
+                ((key, e['time'], e['agent'], e['role'], json.dumps(e['targets'])) for e in events),
+            )
+
+    def read(self, filepath=None):
+        """Yield stored events, for one log or for all of them."""
+        query = 'SELECT file, time, agent, role, targets FROM communication_events'
+        params = ()
+        if filepath is not None:
+            query += ' WHERE file = ?'
+            params = (str(Path(filepath).resolve()),)
+        for file, t, agent, role, targets in self.conn.execute(query + ' ORDER BY rowid', params):
+            yield {'file': file, 'time': t, 'agent': agent, 'role': role, 'targets': json.loads(targets)}
+
+    def close(self):
+        self.conn.close()
+
+
+def open_event_sink(path):
+    """SqliteEventSink for a ``.sqlite``/``.db`` path, otherwise a JsonlEventSink directory."""
+    if Path(path).suffix in ('.sqlite', '.db'):
+        return SqliteEventSink(path)
+    return JsonlEventSink(path)
+
+
+class RunIndex:
+    """SQLite database of analyzed runs for ad hoc queries.
+
+    ``runs`` has one row per file with every scalar metric as a column;
+    ``agent_steps``, ``room_visits`` and ``communication_events`` hold the
+    per-run detail, joined to ``runs`` on ``file_path``.
+    """
+
+    DETAIL_TABLES = {
+        'agent_steps': ('file_path', 'agent', 'steps'),
+        'room_visits': ('file_path', 'agent', 'room', 'visits'),
+        'communication_events': ('file_path', 'time', 'agent', 'role', 'targets'),
+    }
+    INDEXES = (
+        'CREATE INDEX runs_configuration ON runs (complexity, agent_count)',
+        'CREATE INDEX runs_agent_count ON runs (agent_count)',
+        'CREATE INDEX agent_steps_file ON agent_steps (file_path)',
+        'CREATE INDEX room_visits_file ON room_visits (file_path)',
+        'CREATE INDEX room_visits_room ON room_visits (room)',
+        'CREATE INDEX communication_events_file ON communication_events (file_path)',
+    )
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        import sqlite3
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+
+    def write(self, analyzer):
+        """Replace the index contents with the runs of analyzer in one transaction.
+
+        Detail tables are only filled from retained runs (``keep_runs``).
+        """
+        columns = ['file_path', 'complexity', 'agent_count']
+        columns += sorted(analyzer._run_columns.keys() - set(columns))
+        with self.conn:
+            for table in ('runs',) + tuple(self.DETAIL_TABLES):
+                self.conn.execute(f'DROP TABLE IF EXISTS {table}')
+            quoted = ', '.join('"%s"' % name for name in columns)
+            self.conn.execute(f'CREATE TABLE runs ({quoted}, PRIMARY KEY (file_path))')
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO runs VALUES ({', '.join('?' * len(columns))})",
+                zip(*(analyzer._run_columns.get(name, ()) for name in columns)),
+            )
+            for table, fields in self.DETAIL_TABLES.items():
+                self.conn.execute(f"CREATE TABLE {table} ({', '.join(fields)})")
+                self.conn.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(fields))})",
+                                      self._detail_rows(analyzer, table))
+            for statement in self.INDEXES:
+                self.conn.execute(statement)
+        self.conn.execute('ANALYZE')
+
+    def _detail_rows(self, analyzer, table):
+        for run in analyzer._retained_runs():
+            file_path = run['file_path']
+            if table == 'agent_steps':
+                for agent, steps in run['agent_steps'].items():
+                    yield file_path, agent, steps
+            elif table == 'room_visits':
+                for agent, rooms in run['agent_visits'].to_dict(analyzer.agents, analyzer.rooms).items():
+                    for room, visits in rooms.items():
+                        yield file_path, agent, room, visits
+            else:
+                for e in run['communication_events']:
+                    yield file_path, e['time'], e['agent'], e['role'], json.dumps(e['targets'])
+
+    def query(self, sql, params=()):
+        """Run a SQL query and return the rows as dicts."""
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def runs(self, where=None, params=(), complexity=None, agent_count=None, columns='*'):
+        """Rows of ``runs``, optionally filtered by configuration and a SQL condition.
+
+        e.g. ``runs('total_rescues < ? AND total_communications > ?', (20, 30), complexity='Hard Complexity')``.
+        """
+        conditions = []
+        values = []
+        for name, value in (('complexity', complexity), ('agent_count', agent_count)):
+            if value is not None:
+                conditions.append(f'{name} = ?')
+                values.append(value)
+        if where:
+            conditions.append(f'({where})')
+            values.extend(params)
+        sql = f'SELECT {columns} FROM runs'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        return self.query(sql + ' ORDER BY rowid', values)
+
+    def close(self):
+        self.conn.close()
+
+
+class ExperimentMatrix:
+    """The complexity and agent-count axes of a stress-test sweep, and where their logs live.
+
+    Each axis is a list of directory names under ``simulation_dir``; the
+    display labels used in results default to ``EasyMap`` -> ``Easy
+    Complexity`` and ``TwoAgents`` -> ``Two Agents``.
+    """
+
+    DEFAULT_COMPLEXITIES = ('EasyMap', 'MediumMap', 'HardMap')
+    DEFAULT_AGENT_COUNTS = ('TwoAgents', 'ThreeAgents', 'FourAgents', 'FiveAgents')
+
+    def __init__(self, complexities=DEFAULT_COMPLEXITIES, agent_counts=DEFAULT_AGENT_COUNTS,
+                 simulation_dir='Stree_Simulation', patterns=LOG_PATTERNS, labels=None):
+        self.complexities = list(complexities)
+        self.agent_counts = list(agent_counts)
+        self.simulation_dir = simulation_dir
+        self.patterns = list(patterns)
+        self.labels = dict(labels or {})
+
+    @classmethod
+    def from_toml(cls, path):
+        """Load a matrix from a TOML file with ``complexities``/``agent_counts`` lists and optional ``labels``."""
+        try:
+            import tomllib
+        except ImportError:
+            import tomli as tomllib
+        with open(path, 'rb') as f:
+            config = tomllib.load(f)
+        return cls(
+            complexities=config.get('complexities', cls.DEFAULT_COMPLEXITIES),
+            agent_counts=config.get('agent_counts', cls.DEFAULT_AGENT_COUNTS),
+            simulation_dir=config.get('simulation_dir', 'Stree_Simulation'),
+            patterns=config.get('patterns', LOG_PATTERNS),
+            labels=config.get('labels'),
+        )
+
+    def to_dict(self):
+        return {
+            'complexities': self.complexities,
+            'agent_counts': self.agent_counts,
+            'simulation_dir': self.simulation_dir,
+            'patterns': self.patterns,
+            'labels': self.labels,
+        }
+
+    def complexity_label(self, name):
+        return self.labels.get(name) or name.replace('Map', ' Complexity')
+
+    def agent_label(self, name):
+        return self.labels.get(name) or name.replace('Agents', ' Agents')
+
+
+def discover_logs(base_dir, matrix, only=None, sizes=False):
+    """Walk the matrix directories once with os.scandir.
+
+    Returns ``{'configurations': [[complexity, agents], ...], 'files':
+    [[path, complexity, agents, size], ...]}`` for every existing selected
+    configuration directory, listing files pattern by pattern in directory
+    order. ``is_file()`` normally answers from the directory entry's
+    type, but a size costs one stat per file, so sizes are only filled in
+    with ``sizes=True`` and are None otherwise.
+    """
+    root = Path(base_dir) / matrix.simulation_dir
+    listing = {'configurations': [], 'files': []}
+    for complexity in matrix.complexities:
+        for agent_count in matrix.agent_counts:
+            if not _selected(only, complexity, agent_count):
+                continue
+            agent_path = root / complexity / agent_count
+            try:
+                entries = list(os.scandir(agent_path))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            listing['configurations'].append([complexity, agent_count])
+            for pattern in matrix.patterns:
+                for entry in entries:
+                    if fnmatch.fnmatchcase(entry.name, pattern) and entry.is_file():
+                        listing['files'].append([str(agent_path / entry.name), complexity, agent_count,
+                                                 entry.stat().st_size if sizes else None])
+    return listing
+
+
+def load_listing(base_dir, matrix, manifest=None, only=None, refresh=False, sizes=False):
+    """discover_logs, reusing a cached manifest file when it was written for the same root, matrix and filter.
+
+    Sizes in a reused manifest are those recorded when it was written, or
+    None if it was written without them.
+    """
+    key = {'root': str(Path(base_dir).resolve()), 'matrix': matrix.to_dict(), 'only': sorted(only or [])}
+    if manifest and not refresh and os.path.exists(manifest):
+        with open(manifest) as f:
+            cached = json.load(f)
+        if cached.get('key') == key:
+            return cached['listing']
+    listing = discover_logs(base_dir, matrix, only, sizes)
+    if manifest:
+        tmp = f"{manifest}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'key': key, 'listing': listing}, f)
+        os.replace(tmp, manifest)
+    return listing
+
+
+def _selected(only, complexity, agent_count):
+    """Whether a complexity/agent-count directory pair matches any ``only`` pattern (all match if None)."""
+    if not only:
+        return True
+    key = f"{complexity}/{agent_count}"
+    return any(fnmatch.fnmatchcase(key, pattern if '/' in pattern else f"{pattern}/*") for pattern in only)
+
+
+def _agent_name(agent):
+    """Display name for the ``agent`` field of a log record."""
+    if isinstance(agent, dict):
+        agent_id = agent.get('entity_id') or agent.get('name')
+        return agent.get('name') or f"agent_{agent_id}"
+    return str(agent)
+
+
 class StressTestAnalyzer:
-    def __init__(self, base_dir="."):
+    def __init__(self, base_dir=".", json_backend='auto', metric_sets=None, prefilter=False, cache_dir=None,
+                 keep_runs=True, reader='text', chunk_size=None, chunk_workers=None,
+                 capture_events=True, events_path=None, matrix=None, instrument=False):
         self.base_dir = Path(base_dir)
         self.results = {}
+        self.aggregates = {}
+        self.keep_runs = keep_runs
+        self._run_columns = {}
+        self._run_count = 0
+        self.agents = SymbolTable()
+        self.rooms = SymbolTable()
+        self.json_backend = json_backend
+        self.decoder = get_decoder(json_backend)
+        self.metric_sets = frozenset(METRIC_SETS if metric_sets is None else metric_sets)
+        unknown = self.metric_sets - METRIC_SETS.keys()
+        if unknown:
+            raise ValueError(f"Unknown metric sets: {', '.join(sorted(unknown))}")
+        self.prefilter = prefilter
+        if reader not in LINE_READERS:
+            raise ValueError(f"Unknown line reader: {reader!r} (expected one of {', '.join(LINE_READERS)})")
+        self.reader = reader
+        self.chunk_size = chunk_size
+        self.chunk_workers = chunk_workers
+        self.capture_events = capture_events
+        self.matrix = matrix or ExperimentMatrix()
+        self.instrument = instrument
+        self.file_stats = []
+        self.events_path = events_path
+        self._event_sink = None
+        tokens = sorted({token for name in self.metric_sets for token in METRIC_SETS[name]})
+        self._prefilter_search = re.compile(b'|'.join(re.escape(t) for t in tokens) or b'(?!)').search
+        self.cache = MetricsCache(cache_dir) if cache_dir else None
+        self.index = None
+        events_mode = 'sink' if events_path and capture_events else 'memory' if capture_events else 'none'
+        # orjson/msgspec skip NaN/Infinity lines that json accepts, so the backend is part of the key.
+        self._cache_version = (f"{ANALYZER_VERSION}:{self.decoder.name}:{','.join(sorted(self.metric_sets))}:"
+                               f"{events_mode}")
         
-    def analyze_file(self, filepath):
-        """Analyze a single JSON file and extract metrics."""
-        metrics = {
+    def close(self):
+        """Close the event sink, metrics cache and run index connections.
+
+        The event sink is reopened if it is used again; the cache is not,
+        so call this once analysis is done.
+        """
+        if self._event_sink is not None:
+            self._event_sink.close()
+            self._event_sink = None
+        if self.cache is not None:
+            self.cache.close()
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+
+    def _worker_options(self):
+        """Constructor arguments needed to rebuild this analyzer in a worker process."""
+        return {
+            'base_dir': str(self.base_dir),
+            'json_backend': self.json_backend,
+            'metric_sets': sorted(self.metric_sets),
+            'prefilter': self.prefilter,
+            'reader': self.reader,
+            'capture_events': self.capture_events,
+            'events_path': self.events_path,
+            'instrument': self.instrument,
+        }
+
+    @property
+    def event_sink(self):
+        """The external store for communication events, opened on first use; None keeps them in memory."""
+        if self._event_sink is None and self.events_path and self.capture_events:
+            self._event_sink = open_event_sink(self.events_path)
+        return self._event_sink
+
+    def _should_split(self, filepath):
+        """Whether analyze_file should split filepath into parallel chunks."""
+        return (bool(self.chunk_size) and _compression_opener(filepath) is None
+                and os.path.getsize(filepath) > self.chunk_size)
+        
+    def _new_metrics(self):
+        """Return an empty per-file metrics state."""
+        return {
             'total_steps': 0,
             'total_rescues': 0,
+            '_rescues_seen': False,
             'unique_rooms_visited': set(),
             'agent_steps': defaultdict(int),
-            'agent_visits': defaultdict(lambda: defaultdict(int)),
+            'agent_visits': defaultdict(partial(defaultdict, int)),
             'victims_found': 0,
             'simulation_completed': False,
             'final_time': 0,
             'agent_actions': 0,
             'total_communications': 0,
+            'communication_attempts': 0,
+            'communication_successes': 0,
+            'communication_failures': 0,
+            'communication_attempts_per_agent': 0.0,
             'communication_events': [],
+            'agent_interactions': defaultdict(int),
         }
-        
+
+    def analyze_file(self, filepath):
+        """Analyze a single JSON file and extract metrics.
+
+        With ``prefilter`` enabled the file is scanned as bytes and lines
+        that contain none of the key tokens of the enabled metric sets are
+        skipped without being decoded. Files larger than ``chunk_size`` are
+        split into line-aligned byte ranges parsed by ``chunk_workers``
+        processes, and the partial results are merged in file order.
+
+        With ``instrument`` enabled, the file's timing and counter record is
+        appended to ``self.file_stats``.
+        """
+        if self._should_split(filepath):
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=self.chunk_workers) as executor:
+                return self._merge_chunks(filepath, self._submit_chunks(executor, filepath))
+
+        metrics = self._new_metrics()
+        if self.instrument:
+            return self._analyze_instrumented(filepath, metrics)
         try:
-            with open(filepath, 'r') as f:
-                for line_num, line in enumerate(f):
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    try:
-                        rec = json.loads(line)
-                    except json.JSONDecodeError:
-                        continue
-                    
-                    if 'time' in rec:
-                        current_time = rec['time']
-                        if current_time > 0:
-                            metrics['final_time'] = max(metrics['final_time'], current_time)
-                            metrics['total_steps'] = current_time
-                    
-                    if 'world_state' in rec:
-                        ws = rec['world_state']
-                        if isinstance(ws, dict):
-                            if 'total rescues' in ws:
-                                metrics['total_rescues'] = ws['total rescues']
-                            
-                            rd = ws.get('room_descriptions')
-                            if isinstance(rd, list):
-                                
-                                
-                                for room in rd:
-                                    metrics['unique_rooms_visited'].add(room)
-                    
-                    if 'agent' in rec and 'command' in rec:
-                        af = rec['agent']
-                        if isinstance(af, dict):
-                            agent_id = af.get('entity_id') or af.get('name')
-                            agent_name = af.get('name') or f"agent_{agent_id}"
-                        else:
-                            agent_name = str(af)
-                        
-                        metrics['agent_steps'][agent_name] += 1
-                        metrics['agent_actions'] += 1
-                    
-                    if 'parsed_response' in rec and 'agent' in rec:
-                        af = rec['agent']
-                        if isinstance(af, dict):
-                            agent_id = af.get('entity_id') or af.get('name')
-                            agent_name = af.get('name') or f"agent_{agent_id}"
-                        else:
-                            agent_name = str(af)
-                        
-                        pr_raw = rec['parsed_response']
-                        if isinstance(pr_raw, str):
-                            try:
-                                pr = json.loads(pr_raw)
-                            except json.JSONDecodeError:
-                                pr = {}
-                        elif isinstance(pr_raw, dict):
-                            pr = pr_raw
-                        else:
-                            pr = {}
-                        
-                        loc = pr.get('move')
-                        if isinstance(loc, dict):
-                            loc = loc.get('move') or next(iter(loc.values()), None)
-                        if isinstance(loc, str):
-                            metrics['agent_visits'][agent_name][loc] += 1
-                    
-                    if 'parsed_response' in rec:
-                        parsed = rec['parsed_response']
-                        if isinstance(parsed, str):
-                            try:
-                                parsed_data = json.loads(parsed)
-                            except json.JSONDecodeError:
-                                parsed_data = {}
-                        else:
-                            parsed_data = parsed
-                        
-                        if 'communicate' in parsed_data:
-                            metrics['communication_attempts'] += 1
-                            metrics['total_communications'] += 1
-                            
-                            comm_event = {
-                                'time': rec.get('time', 0),
-                                'agent': rec.get('agent', {}),
-                                'targets': parsed_data['communicate']
-                            }
-                            metrics['communication_events'].append(comm_event)
-                            
-                            agent_info = rec.get('agent', {})
-                            initiator = agent_info.get('role', 'unknown')
-                            targets = parsed_data['communicate']
-                            if isinstance(targets, list):
-                                for target in targets:
-                                    interaction_key = f"{initiator}->{target}"
-                                    metrics['agent_interactions'][interaction_key] += 1
-                            elif isinstance(targets, str):
-                                interaction_key = f"{initiator}->{targets}"
-                                metrics['agent_interactions'][interaction_key] += 1
-                    if 'action_result' in rec:
-                        ar = rec['action_result']
-                        if isinstance(ar, dict):
-                            success = ar.get('success', False)
-                            reason = ar.get('reason', '')
-                            if 'communication' in str(ar).lower() or 'communicate' in reason.lower():
-                                if success:
-                                    metrics['communication_successes'] += 1
-                                else:
-                                    metrics['communication_failures'] += 1
-
-                    if 'time' in rec and rec['time'] > 0:
-                        metrics['simulation_completed'] = True
+            self._consume_lines(self._iter_lines(filepath), metrics)
+        except Exception as e:
+            print(f"Error processing file {filepath}: {e}")
+            return None
+
+        return self._finalize_metrics(metrics, filepath)
+
+    def _analyze_instrumented(self, filepath, metrics):
+        """The analyze_file body with per-stage timing, recorded in self.file_stats."""
+        start = time.perf_counter()
+        try:
+            stats = _new_file_stats(filepath, os.path.getsize(filepath))
+            self._consume_lines_instrumented(self._iter_lines(filepath), metrics, stats)
+        except Exception as e:
+            print(f"Error processing file {filepath}: {e}")
+            return None
+        metrics = self._finalize_metrics(metrics, filepath)
+        stats['wall_seconds'] = time.perf_counter() - start
+        self.file_stats.append(stats)
+        return metrics
+
+    def _submit_chunks(self, executor, filepath):
+        """Submit one chunk task per line-aligned range of filepath, returning the futures in file order."""
+        options = self._worker_options()
+        return [executor.submit(_analyze_chunk_task, options, filepath, start, end)
+                for start, end in _line_aligned_ranges(filepath, self.chunk_size)]
+
+    def _merge_chunks(self, filepath, futures):
+        """Merge chunk partials in file order into the metrics analyze_file would return.
+
+        Chunk instrumentation records are summed, so their times are worker
+        seconds rather than wall time.
+        """
+        try:
+            results = [f.result() for f in futures]
+            metrics = self._finalize_metrics(reduce(self._merge_metrics, [m for m, _ in results]), filepath)
+        except Exception as e:
+            print(f"Error processing file {filepath}: {e}")
+            return None
+        if self.instrument:
+            self.file_stats.append(reduce(_merge_file_stats, [stats for _, stats in results]))
+        return metrics
+
+    def _merge_metrics(self, metrics, later):
+        """Fold the partial state of a later part of the same file into metrics."""
+        if later['total_steps'] > 0:
+            metrics['total_steps'] = later['total_steps']
+        metrics['final_time'] = max(metrics['final_time'], later['final_time'])
+        metrics['simulation_completed'] = metrics['simulation_completed'] or later['simulation_completed']
+        if later['_rescues_seen']:
+            metrics['total_rescues'] = later['total_rescues']
+            metrics['_rescues_seen'] = True
+        metrics['unique_rooms_visited'] |= later['unique_rooms_visited']
+        for key in ('victims_found', 'agent_actions', 'total_communications', 'communication_attempts',
+                    'communication_successes', 'communication_failures'):
+            metrics[key] += later[key]
+        for agent, steps in later['agent_steps'].items():
+            metrics['agent_steps'][agent] += steps
+        for agent, rooms in later['agent_visits'].items():
+            visits = metrics['agent_visits'][agent]
+            for room, count in rooms.items():
+                visits[room] += count
+        for key, count in later['agent_interactions'].items():
+            metrics['agent_interactions'][key] += count
+        metrics['communication_events'].extend(later['communication_events'])
+        return metrics
+
+    def _state_to_json(self, metrics):
+        """JSON-serializable copy of a partial metrics state."""
+        state = dict(metrics)
+        state['unique_rooms_visited'] = list(metrics['unique_rooms_visited'])
+        return state
+
+    def _state_from_json(self, state):
+        """Rebuild a partial metrics state saved by _state_to_json."""
+        metrics = self._new_metrics()
+        for key, value in state.items():
+            if key == 'unique_rooms_visited':
+                metrics[key].update(value)
+            elif key == 'agent_visits':
+                for agent, rooms in value.items():
+                    metrics[key][agent].update(rooms)
+            elif key in ('agent_steps', 'agent_interactions'):
+                metrics[key].update(value)
+            else:
+                metrics[key] = value
+        return metrics
+
+    def _analyze_resumable(self, filepath, checkpoint, interval):
+        """analyze_file for a plain log, saving offset and partial state to checkpoint every interval seconds.
+
+        With ``instrument`` enabled, the record appended to self.file_stats
+        covers only the part of the file read in this run.
+        """
+        start = time.perf_counter()
+        follower = self.follow(filepath)
+        resume = checkpoint.resume_point(filepath)
+        if resume is not None:
+            print(f"Resuming {filepath} at byte {resume[0]}")
+            follower.restore(resume[0], self._state_from_json(resume[1]))
+        try:
+            if self.instrument:
+                follower.stats = _new_file_stats(filepath, os.path.getsize(filepath) - follower.consumed)
+            last_save = time.monotonic()
+            while follower.poll(max_bytes=follower.block_size):
+                if time.monotonic() - last_save >= interval:
+                    checkpoint.save_progress(filepath, follower.consumed, self._state_to_json(follower.metrics))
+                    last_save = time.monotonic()
+            metrics = follower.finish()
         except Exception as e:
             print(f"Error processing file {filepath}: {e}")
             return None
+        if follower.stats is not None:
+            follower.stats['wall_seconds'] = time.perf_counter() - start
+            self.file_stats.append(follower.stats)
+        return metrics
+
+    def _iter_lines(self, filepath):
+        """Yield the raw lines of filepath using the configured reader.
+
+        Compressed logs are always stream-decompressed as bytes.
+        """
+        opener = _compression_opener(filepath)
+        if opener is not None:
+            return _iter_compressed_lines(filepath, opener)
+        if self.reader == 'mmap':
+            return _iter_mmap_lines(filepath)
+        return _iter_file_lines(filepath, 'rb' if self.prefilter else 'r')
+
+    def _consume_lines(self, lines, metrics):
+        """Decode each line and feed the resulting records into metrics."""
+        loads = self.decoder.loads
+        decode_error = self.decoder.error
+        search = self._prefilter_search if self.prefilter else None
+        
+        for line in lines:
+            if search and not search(line):
+                continue
+            if not line or line.isspace():
+                continue
+            
+            try:
+                rec = loads(line)
+            except decode_error:
+                continue
+            
+            if isinstance(rec, dict):
+                self._process_record(rec, metrics)
+
+    def _consume_lines_instrumented(self, lines, metrics, stats):
+        """_consume_lines, also timing reads, decoding and each extractor into stats.
+
+        The extractors are shadowed by timed wrappers on the instance for
+        the duration of the call, so the uninstrumented path pays nothing.
+        """
+        clock = time.perf_counter
+        loads = self.decoder.loads
+        decode_error = self.decoder.error
+        search = self._prefilter_search if self.prefilter else None
+        for name, key in TIMED_STAGES.items():
+            setattr(self, name, _timed(getattr(self, name), stats, key))
+        try:
+            lines = iter(lines)
+            while True:
+                start = clock()
+                line = next(lines, None)
+                stats['read_seconds'] += clock() - start
+                if line is None:
+                    break
+                stats['lines_read'] += 1
+                if search and not search(line):
+                    stats['lines_prefiltered'] += 1
+                    continue
+                if not line or line.isspace():
+                    continue
+
+                start = clock()
+                try:
+                    rec = loads(line)
+                except decode_error:
+                    stats['lines_skipped'] += 1
+                    continue
+                finally:
+                    stats['decode_seconds'] += clock() - start
+
+                if isinstance(rec, dict):
+                    start = clock()
+                    self._process_record(rec, metrics)
+                    stats['record_seconds'] += clock() - start
+                    stats['records'] += 1
+        finally:
+            for name in TIMED_STAGES:
+                del self.__dict__[name]
+
+    def _process_record(self, rec, metrics):
+        """Feed one log record to every enabled metric extractor, decoding parsed_response once."""
+        sets = self.metric_sets
+        if 'time' in rec and 'steps' in sets:
+            self._extract_time(rec['time'], metrics)
+        
+        if 'world_state' in rec:
+            self._extract_world_state(rec['world_state'], metrics, sets)
+        
+        agent_name = _agent_name(rec['agent']) if 'agent' in rec else None
+        if agent_name is not None and 'command' in rec and 'agents' in sets:
+            metrics['agent_steps'][agent_name] += 1
+            metrics['agent_actions'] += 1
+        
+        if 'parsed_response' in rec and ('visits' in sets or 'communications' in sets):
+            response = self._decode_response(rec['parsed_response'])
+            if isinstance(response, dict):
+                if agent_name is not None and 'visits' in sets:
+                    self._extract_visits(agent_name, response, metrics)
+                if 'communicate' in response and 'communications' in sets:
+                    self._extract_communication(rec, agent_name, response['communicate'], metrics)
+        
+        if 'action_result' in rec and 'communications' in sets:
+            self._extract_action_result(rec['action_result'], metrics)
+
+    def _decode_response(self, raw):
+        """Decode a parsed_response payload; undecodable strings become an empty dict."""
+        if isinstance(raw, str):
+            try:
+                return self.decoder.loads(raw)
+            except self.decoder.error:
+                return {}
+        return raw
+
+    def _extract_time(self, current_time, metrics):
+        if current_time > 0:
+            metrics['final_time'] = max(metrics['final_time'], current_time)
+            metrics['total_steps'] = current_time
+            metrics['simulation_completed'] = True
+
+    def _extract_world_state(self, ws, metrics, sets):
+        if isinstance(ws, dict):
+            if 'total rescues' in ws and 'rescues' in sets:
+                metrics['total_rescues'] = ws['total rescues']
+                metrics['_rescues_seen'] = True
+            
+            rd = ws.get('room_descriptions')
+            if isinstance(rd, list) and 'rooms' in sets:
+                metrics['unique_rooms_visited'].update(rd)
+
+    def _extract_visits(self, agent_name, response, metrics):
+        loc = response.get('move')
+        if isinstance(loc, dict):
+            loc = loc.get('move') or next(iter(loc.values()), None)
+        if isinstance(loc, str):
+            metrics['agent_visits'][agent_name][loc] += 1
+
+    def _extract_communication(self, rec, agent_name, targets, metrics):
+        metrics['communication_attempts'] += 1
+        metrics['total_communications'] += 1
+        
+        agent_info = rec.get('agent', {})
+        initiator = agent_info.get('role', 'unknown') if isinstance(agent_info, dict) else 'unknown'
+        if self.capture_events:
+            metrics['communication_events'].append({
+                'time': rec.get('time', 0),
+                'agent': agent_name,
+                'role': initiator,
+                'targets': targets,
+            })
+        
+        if isinstance(targets, list):
+            for target in targets:
+                metrics['agent_interactions'][f"{initiator}->{target}"] += 1
+        elif isinstance(targets, str):
+            metrics['agent_interactions'][f"{initiator}->{targets}"] += 1
 
+    def _extract_action_result(self, ar, metrics):
+        if isinstance(ar, dict):
+            success = ar.get('success', False)
+            reason = ar.get('reason', '')
+            if 'communication' in str(ar).lower() or 'communicate' in reason.lower():
+                if success:
+                    metrics['communication_successes'] += 1
+                else:
+                    metrics['communication_failures'] += 1
+
+    def _finalize_metrics(self, metrics, filepath=None):
+        """Derive summary values and convert the per-file state to plain containers.
+
+        With an event sink configured, the file's communication events are
+        written to it and dropped from the returned metrics.
+        """
+        del metrics['_rescues_seen']
+        if filepath is not None and self.event_sink is not None:
+            self.event_sink.write(filepath, metrics['communication_events'])
+            metrics['communication_events'] = []
         metrics['unique_rooms_count'] = len(metrics['unique_rooms_visited'])
         metrics['unique_rooms_visited'] = list(metrics['unique_rooms_visited'])
         
@@ -160,97 +1344,746 @@ class StressTestAnalyzer:
             metrics['total_communications_per_agent'] = metrics['total_communications'] / num_agents
         
         metrics['agent_steps'] = dict(metrics['agent_steps'])
+        metrics['agent_visits'] = {agent: dict(rooms) for agent, rooms in metrics['agent_visits'].items()}
+        metrics['agent_interactions'] = dict(metrics['agent_interactions'])
         
         return metrics
     
-    def analyze_all_files(self):
-        """Analyze all JSON files in the Stree_Simulation directory structure."""
-        complexity_levels = ['EasyMap', 'MediumMap', 'HardMap']
-        agent_counts = ['TwoAgents', 'ThreeAgents', 'FourAgents', 'FiveAgents']
+    def analyze_all_files(self, workers=None, checkpoint_dir=None, checkpoint_interval=60.0, only=None,
+                          manifest=None, refresh_manifest=False):
+        """Analyze all JSON files in the Stree_Simulation directory structure.
+
+        The configurations come from ``self.matrix``; plain ``*.json`` logs
+        and their ``.gz``, ``.zst`` and ``.xz`` compressed forms are picked
+        up by default. With ``manifest`` the file listing is cached there
+        and reused instead of walking the tree again (``refresh_manifest``
+        forces a new walk).
+
+        With ``workers`` > 1 the per-file analysis runs in a process pool,
+        largest files first; results are stored in discovery order so the
+        output matches the serial path.
+
+        With ``checkpoint_dir`` set, finished files and (in serial mode) the
+        partial state of the file in progress are saved there, and a
+        restarted run with the same analyzer options skips or resumes them.
+        The checkpoint is removed once every file has been analyzed.
+
+        ``only`` restricts the run to configurations matching any of the
+        given ``Complexity[/Agents]`` directory patterns, e.g. ``HardMap``
+        or ``*/FiveAgents``. Configurations analyzed by an earlier call are
+        replaced, not added to: their results, accumulators and run-table
+        rows are dropped first.
+        """
+        matrix = self.matrix
+        # Sizes only order the pool's submissions; serial runs need no per-file stat.
+        parallel = bool(workers and workers > 1)
+        listing = load_listing(self.base_dir, matrix, manifest, only, refresh_manifest, sizes=parallel)
+        configurations = [(matrix.complexity_label(complexity), matrix.agent_label(agent_count))
+                          for complexity, agent_count in listing['configurations']]
+        for complexity, agent_count in configurations:
+            self.results.setdefault(complexity, {})[agent_count] = []
+        self._drop_runs(set(configurations))
         
-        for complexity in complexity_levels:
-            complexity_path = self.base_dir / "Stree_Simulation" / complexity
-            if not complexity_path.exists():
-                continue
+        jobs = [(Path(path), matrix.complexity_label(complexity), matrix.agent_label(agent_count))
+                for path, complexity, agent_count, _ in listing['files']]
+        sizes = [size for _, _, _, size in listing['files']]
+        if None in sizes:
+            sizes = None
 
-            complexity_display = complexity.replace('Map', ' Complexity')
-            self.results[complexity_display] = {}
-            
-            for agent_count in agent_counts:
-                agent_path = complexity_path / agent_count
-                if not agent_path.exists():
+        checkpoint = AnalysisCheckpoint(checkpoint_dir, self._cache_version) if checkpoint_dir else None
+        checkpoint_interval = checkpoint_interval if checkpoint else None
+        for (json_file, complexity_display, agent_count_display), metrics in zip(
+                jobs, self._iter_metrics([job[0] for job in jobs], workers, checkpoint, checkpoint_interval, sizes)):
+            if metrics:
+                metrics['file_path'] = str(json_file)
+                metrics['complexity'] = complexity_display
+                metrics['agent_count'] = agent_count_display
+                metrics['num_agents'] = len(metrics['agent_steps'])
+                self._record_run(metrics)
+        if checkpoint is not None:
+            checkpoint.clear()
+        if self.cache is not None:
+            print(f"Metrics cache: {self.cache.hits} hits, {self.cache.misses} misses")
+
+    def _iter_metrics(self, paths, workers=None, checkpoint=None, checkpoint_interval=None, sizes=None):
+        """Yield analyze_file results for paths in input order.
+
+        Fresh cache entries are loaded instead of re-analyzed. With
+        ``workers`` > 1 the remaining files are submitted to a process pool,
+        largest first, and each result is yielded as soon as it and all
+        earlier files are done. Files finished in a checkpointed earlier run
+        are taken from ``checkpoint``; new results are recorded in it.
+        """
+        cached = set()
+        if self.cache is not None:
+            cached = {i for i, path in enumerate(paths) if self.cache.lookup(path, self._cache_version)}
+        resumed = {}
+        if checkpoint is not None:
+            for i, path in enumerate(paths):
+                found, metrics = checkpoint.lookup(path)
+                if found and i not in cached:
+                    resumed[i] = metrics
+        pending = [i for i in range(len(paths)) if i not in cached and i not in resumed]
+
+        executor = None
+        futures = {}
+        if workers and workers > 1 and len(pending) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(max_workers=workers)
+            if sizes is None:
+                sizes = [os.path.getsize(path) for path in paths]
+            for i in sorted(pending, key=lambda i: sizes[i], reverse=True):
+                print(f"Analyzing: {paths[i]}")
+                if self._should_split(paths[i]):
+                    futures[i] = self._submit_chunks(executor, paths[i])
+                else:
+                    futures[i] = executor.submit(_analyze_file_task, self._worker_options(), paths[i])
+
+        try:
+            for i, path in enumerate(paths):
+                if i in cached:
+                    yield self.cache.load(path)
                     continue
-                agent_count_display = agent_count.replace('Agents', ' Agents')
-                self.results[complexity_display][agent_count_display] = []
-
-                json_files = list(agent_path.glob("*.json"))
-                
-                for json_file in json_files:
-                    print(f"Analyzing: {json_file}")
-                    metrics = self.analyze_file(json_file)
-                    if metrics:
-                        metrics['file_path'] = str(json_file)
-                        metrics['complexity'] = complexity_display
-                        metrics['agent_count'] = agent_count_display
-                        metrics['num_agents'] = len(metrics['agent_steps'])
-                        
-                        self.results[complexity_display][agent_count_display].append(metrics)
-    
-    def calculate_aggregate_metrics(self):
-        """Calculate aggregate metrics for each configuration."""
-        aggregate_results = []
-        
-        for complexity, agent_data in self.results.items():
-            for agent_count, runs in agent_data.items():
-                if not runs:
+                if i in resumed:
+                    yield resumed.pop(i)
                     continue
-                avg_metrics = {
-                    'complexity': complexity,
-                    'agent_count': agent_count,
-                    'num_runs': len(runs),
-
-
-                    'avg_total_steps': np.mean([r['total_steps'] for r in runs]),
-                    'avg_total_rescues': np.mean([r['total_rescues'] for r in runs]),
-                    'avg_unique_rooms': np.mean([r['unique_rooms_count'] for r in runs]),
-                    'avg_simulation_time': np.mean([r['final_time'] for r in runs]),
-                    'avg_total_communications': np.mean([r['total_communications'] for r in runs]),
-                    'avg_communication_attempts_per_agent': np.mean([r['communication_attempts_per_agent'] for r in runs]),
-
-
-                    'std_total_steps': np.std([r['total_steps'] for r in runs]),
-                    'std_total_rescues': np.std([r['total_rescues'] for r in runs]),
-                    'std_unique_rooms': np.std([r['unique_rooms_count'] for r in runs]),
-                    'std_simulation_time': np.std([r['final_time'] for r in runs]),
-                    'std_total_communications': np.std([r['total_communications'] for r in runs]),
-                }
-                
-                aggregate_results.append(avg_metrics)
-        
-        return aggregate_results
+                if executor is not None:
+                    future = futures.pop(i)
+                    if isinstance(future, list):
+                        metrics = self._merge_chunks(path, future)
+                    else:
+                        metrics, file_stats = future.result()
+                        self.file_stats.extend(file_stats)
+                else:
+                    print(f"Analyzing: {path}")
+                    if (checkpoint is not None and not self._should_split(path)
+                            and _compression_opener(path) is None):
+                        metrics = self._analyze_resumable(path, checkpoint, checkpoint_interval)
+                    else:
+                        metrics = self.analyze_file(path)
+                if checkpoint is not None:
+                    checkpoint.record(path, metrics)
+                if self.cache is not None and metrics is not None:
+                    self.cache.put(path, self._cache_version, metrics)
+                yield metrics
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    def save_instrumentation(self, filename='instrumentation.json', fmt=None):
+        """Write the per-file instrumentation records as JSON (with totals) or CSV.
+
+        Only files parsed in this run are included: cache hits and files a
+        checkpoint already lists as finished are not instrumented, and a file
+        resumed from a checkpoint only for the part read in this run.
+        """
+        import csv
+        fmt = fmt or ('csv' if Path(filename).suffix == '.csv' else 'json')
+        if fmt not in ('csv', 'json'):
+            raise ValueError(f"Unknown instrumentation format: {fmt!r} (expected csv or json)")
+        with open(filename, 'w', newline='') as f:
+            if fmt == 'csv':
+                writer = csv.DictWriter(f, fieldnames=['file_path', *FILE_STATS_COUNTERS, *FILE_STATS_TIMERS])
+                writer.writeheader()
+                writer.writerows(self.file_stats)
+            else:
+                json.dump({'files': self.file_stats, 'totals': self.instrumentation_totals()}, f, indent=2)
+        print(f"Instrumentation saved to {filename}")
+
+    def instrumentation_totals(self):
+        """Sum of every counter and timer in self.file_stats."""
+        totals = {'files': len(self.file_stats)}
+        totals.update((key, sum(stats[key] for stats in self.file_stats))
+                      for key in FILE_STATS_COUNTERS + FILE_STATS_TIMERS)
+        return totals
+
+    def _record_run(self, metrics):
+        """Add one run to the streaming aggregates and, if keep_runs, to the run table and results."""
+        self._aggregate_run(metrics)
+        complexity, agent_count = metrics['complexity'], metrics['agent_count']
+        if self.keep_runs:
+            self._append_run_row({key: value for key, value in metrics.items() if _is_scalar(value)})
+            self._compact_run(metrics)
+            self.results[complexity][agent_count].append(metrics)
+
+    def _drop_runs(self, configurations):
+        """Forget the accumulators and run-table rows of configurations that are analyzed again."""
+        for configuration in configurations:
+            self.aggregates.pop(configuration, None)
+        columns = self._run_columns
+        if not self._run_count:
+            return
+        keep = [i for i, configuration in enumerate(zip(columns['complexity'], columns['agent_count']))
+                if configuration not in configurations]
+        if len(keep) < self._run_count:
+            for key, column in columns.items():
+                columns[key] = [column[i] for i in keep]
+            self._run_count = len(keep)
+
+    def _aggregate_run(self, metrics):
+        """Fold one run's aggregate metrics into the accumulators of its configuration."""
+        configuration = (metrics['complexity'], metrics['agent_count'])
+        stats = self.aggregates.get(configuration)
+        if stats is None:
+            stats = self.aggregates[configuration] = {name: RunningStats() for name in AGGREGATE_METRICS}
+        for name, key in AGGREGATE_METRICS.items():
+            stats[name].add(metrics[key])
+
+    def _compact_run(self, metrics):
+        """Replace a retained run's room and visit containers with interned compact forms.
+
+        ``unique_rooms_visited`` becomes an int bitset over ``self.rooms``
+        and ``agent_visits`` a VisitMatrix over ``self.agents`` and
+        ``self.rooms``; ``agent_steps`` keys are interned agent names.
+        """
+        metrics['unique_rooms_visited'] = rooms_bitset(metrics['unique_rooms_visited'], self.rooms)
+        metrics['agent_visits'] = VisitMatrix.from_dict(metrics['agent_visits'], self.agents, self.rooms)
+        metrics['agent_steps'] = {self.agents.names[self.agents.intern(a)]: n for a, n in metrics['agent_steps'].items()}
+
+    def _retained_runs(self):
+        return [run for agent_data in self.results.values() for runs in agent_data.values() for run in runs]
+
+    def visit_tensor(self, runs=None):
+        """Stack the visit counts of retained runs into a runs x agents x rooms array over the corpus tables."""
+        import numpy as np
+        runs = self._retained_runs() if runs is None else runs
+        out = np.zeros((len(runs), len(self.agents), len(self.rooms)), dtype=np.int32)
+        for i, run in enumerate(runs):
+            visits = run['agent_visits']
+            out[i][np.ix_(visits.agent_ids, visits.room_ids)] = visits.matrix()
+        return out
+
+    def room_coverage(self, runs=None):
+        """Boolean runs x rooms matrix of the rooms each retained run saw, decoded from the bitsets."""
+        import numpy as np
+        runs = self._retained_runs() if runs is None else runs
+        num_bytes = (len(self.rooms) + 7) // 8
+        packed = np.frombuffer(
+            b''.join(run['unique_rooms_visited'].to_bytes(num_bytes, 'little') for run in runs), dtype=np.uint8
+        ).reshape(len(runs), num_bytes)
+        return np.unpackbits(packed, axis=1, bitorder='little')[:, :len(self.rooms)].astype(bool)
+    
+    def _append_run_row(self, row):
+        """Append one row to the columnar run table, padding columns missing on either side."""
+        columns = self._run_columns
+        for key in row.keys() - columns.keys():
+            columns[key] = [None] * self._run_count
+        for key, column in columns.items():
+            column.append(row.get(key))
+        self._run_count += 1
+
+    def run_table(self):
+        """Return per-run scalar metrics as a DataFrame, one row per analyzed file."""
+        import pandas as pd
+        leading = [key for key in ('complexity', 'agent_count', 'file_path') if key in self._run_columns]
+        order = leading + sorted(self._run_columns.keys() - set(leading))
+        return pd.DataFrame({key: self._run_columns[key] for key in order})
+
+    def calculate_aggregate_metrics(self, confidence=None, quantiles=(0.25, 0.75), bootstrap=0, seed=0):
+        """Calculate aggregate metrics for each configuration.
+
+        With ``keep_runs`` the run table is grouped by complexity and agent
+        count and aggregated column-wise; without it the means and standard
+        deviations come from the streaming accumulators in
+        ``self.aggregates``. With ``confidence`` (e.g. 0.95) each
+        configuration also gets the median, ``quantiles``, standard error
+        and t-based confidence interval of every aggregate metric, plus a
+        bootstrap interval over ``bootstrap`` resamples (see
+        describe_runs); these need the run table, i.e. ``keep_runs``.
+        """
+        if not self.keep_runs:
+            if confidence is not None and self.aggregates:
+                raise ValueError("Confidence statistics need per-run metrics; they are not kept with keep_runs=False")
+            return self._aggregate_from_accumulators()
+        if not self._run_count:
+            return []
+
+        import pandas as pd
+        table = self.run_table()
+        grouped = table.groupby(['complexity', 'agent_count'], sort=False)
+        mean_keys = list(AGGREGATE_METRICS.values())
+        std_keys = [AGGREGATE_METRICS[name] for name in STD_METRICS]
+        means = grouped[mean_keys].mean()
+        stds = grouped[std_keys].std(ddof=0)
+
+        summary = pd.DataFrame({'num_runs': grouped.size()})
+        for name, key in AGGREGATE_METRICS.items():
+            summary[f'avg_{name}'] = means[key]
+        for name, key in zip(STD_METRICS, std_keys):
+            summary[f'std_{name}'] = stds[key]
+
+        if confidence is not None:
+            extra = defaultdict(list)
+            for _, runs in grouped[mean_keys]:
+                for stat, row in describe_runs(runs.to_numpy(float), confidence, quantiles,
+                                               bootstrap, seed).items():
+                    for name, value in zip(AGGREGATE_METRICS, row):
+                        extra[f'{stat}_{name}'].append(float(value))
+            for column, values in extra.items():
+                summary[column] = values
+
+        return summary.reset_index().to_dict('records')
+
+    def _aggregate_from_accumulators(self):
+        """calculate_aggregate_metrics rows from self.aggregates, without numpy or pandas."""
+        summary = []
+        for (complexity, agent_count), stats in self.aggregates.items():
+            row = {'complexity': complexity, 'agent_count': agent_count,
+                   'num_runs': next(iter(stats.values())).count}
+            for name in AGGREGATE_METRICS:
+                row[f'avg_{name}'] = stats[name].mean
+            for name in STD_METRICS:
+                row[f'std_{name}'] = stats[name].std
+            summary.append(row)
+        return summary
 
     
-    def save_detailed_results(self, filename='detailed_results.csv'):
-        """Save detailed results to CSV."""
-        aggregate_results = self.calculate_aggregate_metrics()
-        df = pd.DataFrame(aggregate_results)
-        df.to_csv(filename, index=False)
+    def save_detailed_results(self, filename='detailed_results.csv', fmt=None, **stats_options):
+        """Save detailed results as CSV, JSON or Parquet (inferred from the extension unless fmt is given).
+
+        Keyword arguments are passed to calculate_aggregate_metrics, whose
+        rows are returned as a DataFrame.
+        """
+        import pandas as pd
+        return pd.DataFrame(self._write_detailed_results(filename, fmt, **stats_options))
+
+    def _write_detailed_results(self, filename, fmt=None, **stats_options):
+        """save_detailed_results returning the plain rows; CSV and JSON need neither numpy nor pandas.
+
+        NaN becomes an empty CSV field or ``null`` in JSON.
+        """
+        fmt = fmt or {'.json': 'json', '.parquet': 'parquet'}.get(Path(filename).suffix, 'csv')
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {fmt!r} (expected one of {', '.join(OUTPUT_FORMATS)})")
+        aggregate_results = self.calculate_aggregate_metrics(**stats_options)
+        if fmt == 'parquet':
+            import pandas as pd
+            pd.DataFrame(aggregate_results).to_parquet(filename, index=False)
+        else:
+            rows = [{key: None if isinstance(value, float) and math.isnan(value) else value
+                     for key, value in row.items()} for row in aggregate_results]
+            with open(filename, 'w', newline='') as f:
+                if fmt == 'json':
+                    json.dump(rows, f, indent=2)
+                elif rows:
+                    import csv
+                    writer = csv.DictWriter(f, fieldnames=list(rows[0]), lineterminator='\n')
+                    writer.writeheader()
+                    writer.writerows(rows)
         print(f"Detailed results saved to {filename}")
         
-        return df
-
-def main():
-    analyzer = StressTestAnalyzer()
-    analyzer.analyze_all_files()
-    for complexity in ['Easy Complexity', 'Medium Complexity', 'Hard Complexity']:
-        print(f"\n{complexity}:")
-        if complexity in analyzer.results:
-            for agent_count, runs in analyzer.results[complexity].items():
-                if runs:
-                    avg_rescues = np.mean([r['total_rescues'] for r in runs])
-                    avg_steps = np.mean([r['total_steps'] for r in runs])
-                    avg_communications = np.mean([r['total_communications'] for r in runs])
-                    avg_task_balance = np.mean([r['task_distribution_balance'] for r in runs])
+        return aggregate_results
+
+    def build_index(self, path):
+        """Write the analyzed runs to a RunIndex at path and keep it open as ``self.index`` for queries."""
+        if self.index is None or self.index.path != Path(path):
+            self.open_index(path)
+        self.index.write(self)
+        print(f"Run index saved to {path}")
+        return self.index
+
+    def open_index(self, path):
+        """Open an existing RunIndex as ``self.index`` without analyzing anything."""
+        if self.index is not None:
+            self.index.close()
+        self.index = RunIndex(path)
+        return self.index
+
+    def query_runs(self, where=None, params=(), complexity=None, agent_count=None, columns='*'):
+        """RunIndex.runs on ``self.index``; see build_index and open_index."""
+        if self.index is None:
+            raise RuntimeError("No run index: call build_index() or open_index() first")
+        return self.index.runs(where, params, complexity, agent_count, columns)
+
+    def save_columnar(self, directory, fmt='parquet'):
+        """Write per-run data as Parquet or Arrow IPC datasets partitioned by complexity and agent_count.
+
+        ``runs`` holds the run table, ``agent_steps`` one row per agent and
+        run, and ``events`` one row per communication event, each under
+        directory as ``complexity=.../agent_count=...`` (hive layout, read
+        back with ``pyarrow.dataset.dataset(path, partitioning='hive')``).
+        The last two need retained runs, and events sent to an event sink
+        are only in the sink.
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        if fmt not in COLUMNAR_FORMATS:
+            raise ValueError(f"Unknown columnar format: {fmt!r} (expected one of {', '.join(COLUMNAR_FORMATS)})")
+        if not self._run_count:
+            print("No runs to save")
+            return
+        tables = {'runs': pa.Table.from_pandas(self.run_table(), preserve_index=False)}
+        if self.keep_runs:
+            steps = defaultdict(list)
+            events = defaultdict(list)
+            for run in self._retained_runs():
+                for agent, count in run['agent_steps'].items():
+                    for key, value in (('complexity', run['complexity']), ('agent_count', run['agent_count']),
+                                       ('file_path', run['file_path']), ('agent', agent), ('steps', count)):
+                        steps[key].append(value)
+                for event in run['communication_events']:
+                    targets = event['targets']
+                    for key, value in (('complexity', run['complexity']), ('agent_count', run['agent_count']),
+                                       ('file_path', run['file_path']), ('time', event['time']),
+                                       ('agent', event['agent']), ('role', event['role']),
+                                       ('targets', [str(t) for t in targets] if isinstance(targets, list)
+                                        else [str(targets)])):
+                        events[key].append(value)
+            tables['agent_steps'] = pa.table(steps, schema=pa.schema([
+                ('complexity', pa.string()), ('agent_count', pa.string()), ('file_path', pa.string()),
+                ('agent', pa.string()), ('steps', pa.int64())]))
+            tables['events'] = pa.table(events, schema=pa.schema([
+                ('complexity', pa.string()), ('agent_count', pa.string()), ('file_path', pa.string()),
+                ('time', pa.float64()), ('agent', pa.string()), ('role', pa.string()),
+                ('targets', pa.list_(pa.string()))]))
+        partitioning = ds.partitioning(pa.schema([('complexity', pa.string()), ('agent_count', pa.string())]),
+                                       flavor='hive')
+        for name, table in tables.items():
+            ds.write_dataset(table, os.path.join(directory, name), format='parquet' if fmt == 'parquet' else 'ipc',
+                             partitioning=partitioning, existing_data_behavior='delete_matching')
+        print(f"Per-run datasets ({', '.join(tables)}) saved to {directory}")
+
+    def follow(self, filepath):
+        """Return a LogFollower that incrementally analyzes a log still being written."""
+        return LogFollower(self, filepath)
+
+
+class LogFollower:
+    """Incremental analysis of one growing scenario log.
+
+    Each poll() reads only the bytes appended since the previous poll and
+    feeds the complete lines into a running metrics state; a trailing line
+    without its newline is held back until the rest of it arrives. If the
+    file shrinks (truncated or replaced) the state is reset and the file is
+    read again from the start. Setting ``stats`` to a file stats record
+    times reads, decoding and extractors into it.
+    """
+
+    def __init__(self, analyzer, filepath, block_size=1 << 22):
+        if _compression_opener(filepath) is not None:
+            raise ValueError(f"Cannot follow compressed log {filepath}")
+        self.analyzer = analyzer
+        self.filepath = filepath
+        self.block_size = block_size
+        self.stats = None
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.metrics = self.analyzer._new_metrics()
+        self._pending = b''
+
+    def poll(self, max_bytes=None):
+        """Consume newly appended lines, at most max_bytes of them; return True if any were read."""
+        try:
+            size = os.path.getsize(self.filepath)
+        except FileNotFoundError:
+            return False
+        if size < self.offset:
+            self.reset()
+        remaining = size - self.offset if max_bytes is None else min(max_bytes, size - self.offset)
+        if remaining <= 0:
+            return False
+        with open(self.filepath, 'rb') as f:
+            f.seek(self.offset)
+            while remaining > 0:
+                start = time.perf_counter()
+                block = f.read(min(self.block_size, remaining))
+                if self.stats is not None:
+                    self.stats['read_seconds'] += time.perf_counter() - start
+                if not block:
+                    break
+                remaining -= len(block)
+                self.offset += len(block)
+                lines = (self._pending + block).split(b'\n')
+                self._pending = lines.pop()
+                self._consume(lines)
+        return True
+
+    def _consume(self, lines):
+        if self.stats is None:
+            self.analyzer._consume_lines(lines, self.metrics)
+        else:
+            self.analyzer._consume_lines_instrumented(lines, self.metrics, self.stats)
+
+    @property
+    def consumed(self):
+        """Byte offset up to which every line has been fed into metrics."""
+        return self.offset - len(self._pending)
+
+    def restore(self, offset, metrics):
+        """Continue from a previously saved consumed offset and metrics state."""
+        self.offset = offset
+        self.metrics = metrics
+        self._pending = b''
+
+    def snapshot(self):
+        """Current values of the live metrics, cheap enough to call after every poll."""
+        m = self.metrics
+        return {
+            'file_path': str(self.filepath),
+            'offset': self.offset,
+            'final_time': m['final_time'],
+            'total_steps': m['total_steps'],
+            'total_rescues': m['total_rescues'],
+            'agent_steps': dict(m['agent_steps']),
+            'total_communications': m['total_communications'],
+            'communication_successes': m['communication_successes'],
+            'communication_failures': m['communication_failures'],
+        }
+
+    def finish(self):
+        """Consume any unterminated last line and return the final metrics; do not poll afterwards."""
+        self.poll()
+        if self._pending:
+            self._consume([self._pending])
+            self._pending = b''
+        return self.analyzer._finalize_metrics(self.metrics, self.filepath)
+
+
+def _follow_logs(analyzer, paths, interval):
+    """Poll paths until interrupted, printing a JSON snapshot whenever a log grows."""
+    followers = [analyzer.follow(path) for path in paths]
+    try:
+        while True:
+            for follower in followers:
+                if follower.poll():
+                    print(json.dumps(follower.snapshot()), flush=True)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+
+def _frame_label(func):
+    filename, lineno, name = func
+    if filename == '~':
+        return name.replace(';', ',')
+    return f"{name} ({os.path.basename(filename)}:{lineno})".replace(';', ',')
+
+
+def write_folded_stacks(stats, filename, min_fraction=0.0005):
+    """Write a pstats.Stats profile as folded stacks for flamegraph.pl or speedscope.
+
+    cProfile keeps only caller/callee edges, so each function's time is
+    split between the paths reaching it in proportion to the cumulative
+    time of each edge; stacks worth less than ``min_fraction`` of the
+    total are dropped.
+    """
+    entries = stats.stats
+    callees = defaultdict(list)
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees[caller].append((func, edge[3]))
+    roots = [func for func, entry in entries.items() if not entry[4]]
+    cutoff = min_fraction * sum(entries[func][3] for func in roots)
+    folded = defaultdict(float)
+
+    def walk(func, stack, fraction):
+        stack = stack + (_frame_label(func),)
+        folded[';'.join(stack)] += entries[func][2] * fraction
+        for callee, edge_time in callees[func]:
+            callee_time = entries[callee][3]
+            share = fraction * edge_time / callee_time if callee_time else 0.0
+            if callee_time * share >= cutoff and _frame_label(callee) not in stack:
+                walk(callee, stack, share)
+
+    for root in roots:
+        walk(root, (), 1.0)
+    with open(filename, 'w') as f:
+        for stack, seconds in folded.items():
+            micros = round(seconds * 1e6)
+            if micros:
+                f.write(f"{stack} {micros}\n")
+
+
+def profile_call(func, prefix, profiler='cprofile', top=20):
+    """Run func under a profiler, write its outputs next to prefix and print the hottest functions.
+
+    cProfile writes ``prefix.pstats`` and ``prefix.folded`` (folded stacks,
+    approximate, see write_folded_stacks); pyinstrument writes
+    ``prefix.speedscope.json``. Only this process is profiled, not pool
+    workers.
+    """
+    if profiler == 'pyinstrument':
+        from pyinstrument import Profiler
+        from pyinstrument.renderers import SpeedscopeRenderer
+        session = Profiler()
+        session.start()
+        try:
+            return func()
+        finally:
+            session.stop()
+            with open(f"{prefix}.speedscope.json", 'w') as f:
+                f.write(session.output(SpeedscopeRenderer()))
+            print(session.output_text(color=False))
+            print(f"Profile saved to {prefix}.speedscope.json")
+    if profiler != 'cprofile':
+        raise ValueError(f"Unknown profiler: {profiler!r} (expected one of {', '.join(PROFILERS)})")
+    import cProfile
+    import pstats
+    session = cProfile.Profile()
+    session.enable()
+    try:
+        return func()
+    finally:
+        session.disable()
+        stats = pstats.Stats(session)
+        stats.dump_stats(f"{prefix}.pstats")
+        write_folded_stacks(stats, f"{prefix}.folded")
+        stats.sort_stats('tottime').print_stats(top)
+        stats.sort_stats('cumulative').print_stats(top)
+        print(f"Profile saved to {prefix}.pstats and {prefix}.folded")
+
+
+def _analyze_file_task(options, filepath):
+    """Process-pool entry point: analyze one file in a fresh analyzer, returning its metrics and file_stats."""
+    analyzer = StressTestAnalyzer(**options)
+    return analyzer.analyze_file(filepath), analyzer.file_stats
+
+def _analyze_chunk_task(options, filepath, start, end):
+    """Process-pool entry point: parse one byte range of a file into partial metrics.
+
+    Returns the partial state and, if instrumented, the chunk's stats
+    record (else None). Events stay in the partial state; the parent
+    writes them to the sink after merging.
+    """
+    analyzer = StressTestAnalyzer(**dict(options, events_path=None))
+    metrics = analyzer._new_metrics()
+    if not analyzer.instrument:
+        analyzer._consume_lines(_iter_mmap_lines(filepath, start, end), metrics)
+        return metrics, None
+    began = time.perf_counter()
+    stats = _new_file_stats(filepath, end - start)
+    analyzer._consume_lines_instrumented(_iter_mmap_lines(filepath, start, end), metrics, stats)
+    stats['wall_seconds'] = time.perf_counter() - began
+    return metrics, stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='stress-analyze', description="Analyze stress test simulation logs.")
+    parser.add_argument('root', nargs='?', default='.',
+                        help="corpus root containing the Stree_Simulation directory (default: .)")
+    parser.add_argument('--config', metavar='TOML',
+                        help="experiment matrix file declaring the complexity and agent-count axes")
+    parser.add_argument('--manifest', metavar='PATH',
+                        help="cache the discovered file listing here and reuse it on later runs")
+    parser.add_argument('--refresh-manifest', action='store_true',
+                        help="walk the corpus again even if --manifest exists")
+    parser.add_argument('--only', action='append', metavar='COMPLEXITY[/AGENTS]',
+                        help="analyze only matching configurations, e.g. HardMap/FiveAgents or '*/TwoAgents' "
+                             "(repeatable)")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS,
+                        help="format of the aggregate results file (default: from the -o extension, else csv)")
+    parser.add_argument('-o', '--output',
+                        help="aggregate results file (default: detailed_results.<format>)")
+    parser.add_argument('--profile', nargs='?', const='stress-analyze', metavar='PREFIX',
+                        help="profile the analysis, print the hottest functions and write PREFIX.pstats and "
+                             "PREFIX.folded (default prefix: stress-analyze); pool workers are not profiled")
+    parser.add_argument('--profiler', choices=PROFILERS, default='cprofile',
+                        help="profiler for --profile; pyinstrument writes PREFIX.speedscope.json instead "
+                             "(default: cprofile)")
+    parser.add_argument('--instrument', metavar='REPORT',
+                        help="time each stage per file and write the report here (.json or .csv)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of worker processes for per-file analysis (default: 1)")
+    parser.add_argument('--json-backend', choices=('auto',) + JSON_BACKENDS, default='auto',
+                        help="JSON decoder to use (default: fastest installed)")
+    parser.add_argument('--metrics', default=','.join(METRIC_SETS),
+                        help=f"comma-separated metric sets to compute (default: {','.join(METRIC_SETS)})")
+    parser.add_argument('--prefilter', action='store_true',
+                        help="skip lines that cannot affect the selected metric sets without decoding them")
+    parser.add_argument('--reader', choices=LINE_READERS, default='text',
+                        help="how log lines are read: buffered text or memory-mapped bytes (default: text)")
+    parser.add_argument('--chunk-size', type=int,
+                        help="split files larger than this many bytes into chunks parsed in parallel")
+    parser.add_argument('--chunk-workers', type=int,
+                        help="worker processes for chunked files when --workers is 1 (default: CPU count)")
+    parser.add_argument('--cache-dir',
+                        help="directory for the persistent per-file metrics cache (default: no cache)")
+    parser.add_argument('--events-sink', metavar='PATH',
+                        help="write communication events to a SQLite file (.sqlite/.db) or a JSONL directory "
+                             "instead of keeping them in memory")
+    parser.add_argument('--no-events', action='store_true',
+                        help="do not capture communication events at all; only counts are kept")
+    parser.add_argument('--checkpoint-dir',
+                        help="save progress here so an interrupted run can resume (default: no checkpoint)")
+    parser.add_argument('--checkpoint-interval', type=float, default=60.0,
+                        help="seconds between in-file progress saves (default: 60)")
+    parser.add_argument('--confidence', type=float, metavar='LEVEL',
+                        help="add medians, quartiles, standard errors and t confidence intervals at this level "
+                             "(e.g. 0.95) to the aggregate results")
+    parser.add_argument('--bootstrap', type=int, default=0, metavar='N',
+                        help="with --confidence, also add bootstrap intervals of the mean from N resamples")
+    parser.add_argument('--columnar', metavar='DIR',
+                        help="also write per-run metrics, agent steps and events as partitioned datasets here")
+    parser.add_argument('--columnar-format', choices=COLUMNAR_FORMATS, default='parquet',
+                        help="format for --columnar: parquet or arrow (IPC) (default: parquet)")
+    parser.add_argument('--index', metavar='DB',
+                        help="also load per-run metrics, agent steps, room visits and events into this SQLite file")
+    parser.add_argument('--query', metavar='SQL',
+                        help="run SQL against the --index database and print the rows as JSON, without analyzing")
+    parser.add_argument('--aggregate-only', action='store_true',
+                        help="keep only the per-configuration mean/std accumulators in memory, even with "
+                             "--columnar or --index (which then have no runs to work with); per-run metrics are "
+                             "otherwise kept only when --confidence, --columnar or --index needs them")
+    parser.add_argument('--follow', nargs='+', metavar='LOG',
+                        help="follow running simulation logs and print updated metrics as they grow")
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help="seconds between polls in --follow mode (default: 1.0)")
+    args = parser.parse_args(argv)
+    if args.aggregate_only and args.confidence is not None:
+        parser.error("--confidence needs per-run metrics, which --aggregate-only does not keep")
+
+    # Aggregates come from the run table when runs are kept and from the accumulators otherwise.
+    keep_runs = not args.aggregate_only and (args.confidence is not None or bool(args.columnar or args.index))
+    analyzer = StressTestAnalyzer(args.root, json_backend=args.json_backend, metric_sets=args.metrics.split(','),
+                                  prefilter=args.prefilter, cache_dir=args.cache_dir,
+                                  keep_runs=keep_runs, reader=args.reader,
+                                  chunk_size=args.chunk_size, chunk_workers=args.chunk_workers,
+                                  capture_events=not args.no_events, events_path=args.events_sink,
+                                  matrix=ExperimentMatrix.from_toml(args.config) if args.config else None,
+                                  instrument=bool(args.instrument))
+    try:
+        if args.query:
+            if not args.index:
+                parser.error("--query needs --index")
+            for row in analyzer.open_index(args.index).query(args.query):
+                print(json.dumps(row))
+            return
+        if args.follow:
+            _follow_logs(analyzer, args.follow, args.interval)
+            return
+        run = partial(analyzer.analyze_all_files, workers=args.workers, checkpoint_dir=args.checkpoint_dir,
+                      checkpoint_interval=args.checkpoint_interval, only=args.only,
+                      manifest=args.manifest, refresh_manifest=args.refresh_manifest)
+        if args.profile:
+            profile_call(run, args.profile, args.profiler)
+        else:
+            run()
+        current = None
+        for (complexity, agent_count), stats in analyzer.aggregates.items():
+            if complexity != current:
+                current = complexity
+                print(f"\n{complexity}:")
+            print(f"  {agent_count}: rescues={stats['total_rescues'].mean:.2f} steps={stats['total_steps'].mean:.2f} "
+                  f"communications={stats['total_communications'].mean:.2f}")
+        if analyzer.aggregates:
+            print()
+            analyzer._write_detailed_results(args.output or f"detailed_results.{args.format or 'csv'}", args.format,
+                                             confidence=args.confidence, bootstrap=args.bootstrap)
+            if args.columnar:
+                analyzer.save_columnar(args.columnar, args.columnar_format)
+            if args.index:
+                analyzer.build_index(args.index)
+        if args.instrument:
+            totals = analyzer.instrumentation_totals()
+            print(f"Instrumented {totals['files']} file(s): {totals['lines_read']} lines, "
+                  f"{totals['lines_skipped']} undecodable, read {totals['read_seconds']:.3f}s, "
+                  f"decode {totals['decode_seconds']:.3f}s, records {totals['record_seconds']:.3f}s")
+            analyzer.save_instrumentation(args.instrument)
+    finally:
+        analyzer.close()
 
 if __name__ == "__main__":
     main()
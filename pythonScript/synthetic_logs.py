@@ -0,0 +1,154 @@
+"""
+Synthetic scenario logs for benchmarking the stress test analyzer at scale
+"""
+
+import argparse
+import json
+import random
+import uuid
+from pathlib import Path
+
+# Rooms on the map and the expected ticks per rescue, tuned so a run of the
+# default length ends near the step counts in data_analysis/.
+MAP_COMPLEXITY = {
+    'EasyMap': {'rooms': 12, 'ticks_per_rescue': 24},
+    'MediumMap': {'rooms': 20, 'ticks_per_rescue': 40},
+    'HardMap': {'rooms': 32, 'ticks_per_rescue': 70},
+}
+VICTIMS = 34
+ROLES = ('medic', 'engineer', 'scout', 'leader', 'carrier')
+# Relative frequency of each action, after the event type counts of the published runs.
+ACTIONS = {'ask': 50, 'move': 38, 'communicate': 5, 'load': 3, 'search': 2, 'examine': 1, 'treat': 1}
+NUMBER_WORDS = {
+    1: 'One', 2: 'Two', 3: 'Three', 4: 'Four', 5: 'Five', 6: 'Six', 7: 'Seven', 8: 'Eight', 9: 'Nine',
+    10: 'Ten', 20: 'Twenty', 50: 'Fifty', 100: 'Hundred',
+}
+
+
+def agents_dir(count):
+    """Directory name for an agent count, e.g. 5 -> ``FiveAgents``."""
+    return f"{NUMBER_WORDS.get(count, count)}Agents"
+
+
+def _dumps(record):
+    return json.dumps(record, separators=(', ', ': '))
+
+
+def _agent_records(rnd, time, agent, rooms, names):
+    """The response and action_result records for one agent acting at one tick."""
+    action = rnd.choices(list(ACTIONS), weights=list(ACTIONS.values()))[0]
+    response = {'action': action}
+    if action == 'move':
+        room = rnd.choice(rooms)
+        response['move'] = room if rnd.random() < 0.8 else {'move': room}
+        result = {'success': rnd.random() < 0.9, 'reason': f"moved to {room}"}
+    elif action == 'communicate':
+        others = [name for name in names if name != agent['name']] or names
+        response['communicate'] = rnd.sample(others, rnd.randint(1, min(2, len(others))))
+        response['message'] = 'victim located, need assistance'
+        delivered = rnd.random() < 0.75
+        result = {'success': delivered,
+                  'reason': 'communicate delivered' if delivered else 'communicate failed: recipient busy'}
+    else:
+        response[action] = rnd.choice(rooms)
+        result = {'success': rnd.random() < 0.7, 'reason': f"{action} done"}
+    return [
+        {'time': time, 'agent': agent, 'command': f"{action} {rnd.choice(rooms)}",
+         'parsed_response': _dumps(response)},
+        {'time': time, 'agent': agent, 'action_result': result},
+    ]
+
+
+def write_scenario(path, complexity='EasyMap', agents=3, steps=800, malformed_rate=0.0, activity=0.6, seed=None):
+    """Write one scenario log of ``steps`` ticks to path and return the number of lines written.
+
+    Each tick logs the world state (rescue count and the rooms in view),
+    then every agent acts with probability ``activity``: a command with
+    its ``parsed_response`` (move, communicate, ask, ...) and the
+    ``action_result``. A ``malformed_rate`` fraction of lines is followed
+    by a truncated copy that is not valid JSON.
+    """
+    rnd = random.Random(seed)
+    spec = MAP_COMPLEXITY[complexity]
+    rooms = [f"room_{i}" for i in range(spec['rooms'])]
+    names = [f"Agent{i + 1}" for i in range(agents)]
+    roster = [{'name': name, 'entity_id': i + 1, 'role': ROLES[i % len(ROLES)]} for i, name in enumerate(names)]
+    rescues = 0
+    lines = 0
+    with open(path, 'w') as f:
+        def emit(record):
+            nonlocal lines
+            line = _dumps(record)
+            f.write(line + '\n')
+            lines += 1
+            if malformed_rate and rnd.random() < malformed_rate:
+                f.write(line[:len(line) // 2] + '\n')
+                lines += 1
+
+        for time in range(1, steps + 1):
+            if rescues < VICTIMS and rnd.random() < 1 / spec['ticks_per_rescue']:
+                rescues += 1
+            emit({'time': time, 'world_state': {
+                'total rescues': rescues,
+                'room_descriptions': rnd.sample(rooms, min(3, len(rooms))),
+            }})
+            for agent in roster:
+                if rnd.random() < activity:
+                    for record in _agent_records(rnd, time, agent, rooms, names):
+                        emit(record)
+    return lines
+
+
+def generate_corpus(root, complexities=tuple(MAP_COMPLEXITY), agent_counts=(2, 3, 4, 5), runs=3, steps=800,
+                    malformed_rate=0.001, seed=0):
+    """Write ``runs`` scenarios per configuration under root/Stree_Simulation; return the file paths."""
+    rnd = random.Random(seed)
+    paths = []
+    for complexity in complexities:
+        for count in agent_counts:
+            directory = Path(root) / 'Stree_Simulation' / complexity / agents_dir(count)
+            directory.mkdir(parents=True, exist_ok=True)
+            for _ in range(runs):
+                path = directory / f"scenario_json_outputs-{uuid.UUID(int=rnd.getrandbits(128), version=4)}.json"
+                write_scenario(path, complexity, count, steps, malformed_rate, seed=rnd.getrandbits(32))
+                paths.append(path)
+    return paths
+
+
+def write_matrix(filename, complexities, agent_counts):
+    """Write an experiment matrix TOML covering a generated corpus, for ``stress-analyze --config``."""
+    quoted = lambda names: ', '.join(f'"{name}"' for name in names)
+    with open(filename, 'w') as f:
+        f.write(f"complexities = [{quoted(complexities)}]\n")
+        f.write(f"agent_counts = [{quoted(agents_dir(count) for count in agent_counts)}]\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic stress test scenario logs.")
+    parser.add_argument('root', help="corpus root; logs are written under ROOT/Stree_Simulation")
+    parser.add_argument('--complexity', nargs='+', choices=list(MAP_COMPLEXITY), default=list(MAP_COMPLEXITY),
+                        help="map complexities to generate (default: all)")
+    parser.add_argument('--agents', nargs='+', type=int, default=[2, 3, 4, 5],
+                        help="agent counts to generate (default: 2 3 4 5)")
+    parser.add_argument('--runs', type=int, default=3, help="scenarios per configuration (default: 3)")
+    parser.add_argument('--steps', type=int, default=800, help="ticks per scenario (default: 800)")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="multiply --steps, e.g. 10 or 100 for larger-than-real runs")
+    parser.add_argument('--malformed-rate', type=float, default=0.001,
+                        help="fraction of lines followed by a truncated, undecodable line (default: 0.001)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument('--write-config', metavar='TOML',
+                        help="also write an experiment matrix covering the generated configurations")
+    args = parser.parse_args()
+
+    steps = int(args.steps * args.scale)
+    paths = generate_corpus(args.root, args.complexity, args.agents, args.runs, steps, args.malformed_rate, args.seed)
+    size = sum(path.stat().st_size for path in paths)
+    print(f"Wrote {len(paths)} scenario(s) of {steps} steps, {size / 1e6:.1f} MB, under {args.root}")
+    if args.write_config:
+        write_matrix(args.write_config, args.complexity, args.agents)
+        print(f"Experiment matrix saved to {args.write_config}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import pytest
+
+from stress_test_analysis import AnalysisCheckpoint, RunningStats, StressTestAnalyzer
+from synthetic_logs import generate_corpus
+
+
+@pytest.fixture(scope='module')
+def corpus(tmp_path_factory):
+    root = tmp_path_factory.mktemp('corpus')
+    generate_corpus(root, agent_counts=(2, 3), runs=2, steps=120, malformed_rate=0.01)
+    return root
+
+
+def test_cache_reports_hits_and_misses(corpus, tmp_path, capsys):
+    StressTestAnalyzer(corpus, cache_dir=tmp_path).analyze_all_files()
+    assert 'Metrics cache: 0 hits, 12 misses' in capsys.readouterr().out
+    StressTestAnalyzer(corpus, cache_dir=tmp_path).analyze_all_files()
+    assert 'Metrics cache: 12 hits, 0 misses' in capsys.readouterr().out
+
+
+def test_aggregates_match_run_table(corpus):
+    analyzer = StressTestAnalyzer(corpus)
+    analyzer.analyze_all_files()
+    table = analyzer.run_table()
+    for row in analyzer.calculate_aggregate_metrics():
+        runs = table[(table['complexity'] == row['complexity']) & (table['agent_count'] == row['agent_count'])]
+        assert row['num_runs'] == len(runs)
+        assert row['avg_total_steps'] == pytest.approx(runs['total_steps'].mean())
+        assert row['std_total_communications'] == pytest.approx(runs['total_communications'].std(ddof=0))
+
+
+def test_aggregate_only_keeps_no_runs(corpus):
+    full = StressTestAnalyzer(corpus)
+    full.analyze_all_files()
+    lean = StressTestAnalyzer(corpus, keep_runs=False)
+    lean.analyze_all_files()
+    assert lean._run_count == 0
+    assert lean.calculate_aggregate_metrics() == full.calculate_aggregate_metrics()
+    with pytest.raises(ValueError):
+        lean.calculate_aggregate_metrics(confidence=0.95)
+
+
+def test_discover_logs_sizes_only_on_request(corpus):
+    from stress_test_analysis import ExperimentMatrix, discover_logs
+    matrix = ExperimentMatrix(agent_counts=('TwoAgents', 'ThreeAgents'))
+    plain = discover_logs(corpus, matrix)
+    sized = discover_logs(corpus, matrix, sizes=True)
+    assert len(plain['files']) == 12
+    assert all(size is None for *_, size in plain['files'])
+    assert [f[:3] for f in sized['files']] == [f[:3] for f in plain['files']]
+    assert all(size > 0 for *_, size in sized['files'])
+
+
+def test_parallel_matches_serial(corpus):
+    serial = StressTestAnalyzer(corpus)
+    serial.analyze_all_files()
+    parallel = StressTestAnalyzer(corpus)
+    parallel.analyze_all_files(workers=2)
+    assert parallel.calculate_aggregate_metrics() == serial.calculate_aggregate_metrics()
+
+
+@pytest.fixture
+def small_corpus(tmp_path):
+    root = tmp_path / 'corpus'
+    paths = generate_corpus(root, complexities=('EasyMap',), agent_counts=(2,), runs=3, steps=300,
+                            malformed_rate=0.01)
+    return root, sorted(paths)
+
+
+def _records(analyzer):
+    return analyzer.run_table().sort_values('file_path').to_dict('records')
+
+
+def test_checkpoint_resumes_interrupted_run(small_corpus, tmp_path, capsys):
+    root, paths = small_corpus
+    interrupted = StressTestAnalyzer(root)
+    checkpoint = AnalysisCheckpoint(tmp_path / 'ck', interrupted._cache_version)
+    checkpoint.record(paths[0], interrupted.analyze_file(paths[0]))
+    follower = interrupted.follow(paths[1])
+    follower.poll(max_bytes=paths[1].stat().st_size // 2)
+    checkpoint.save_progress(paths[1], follower.consumed, interrupted._state_to_json(follower.metrics))
+    checkpoint._log.close()
+
+    resumed = StressTestAnalyzer(root)
+    resumed.analyze_all_files(checkpoint_dir=tmp_path / 'ck')
+    out = capsys.readouterr().out
+    assert f"Analyzing: {paths[0]}" not in out
+    assert f"Resuming {paths[1]} at byte {follower.consumed}" in out
+    assert not (tmp_path / 'ck' / 'completed.jsonl').exists()
+
+    uninterrupted = StressTestAnalyzer(root)
+    uninterrupted.analyze_all_files()
+    assert _records(resumed) == _records(uninterrupted)
+    run = next(run for run in resumed._retained_runs() if run['file_path'] == str(paths[1]))
+    expected = StressTestAnalyzer(root).analyze_file(paths[1])
+    assert {key: run[key] for key in ('total_steps', 'total_rescues', 'final_time', 'agent_steps',
+                                      'total_communications', 'communication_events')} == \
+           {key: expected[key] for key in ('total_steps', 'total_rescues', 'final_time', 'agent_steps',
+                                           'total_communications', 'communication_events')}
+
+
+def test_checkpoint_ignores_other_analyzer_options(small_corpus, tmp_path, capsys):
+    root, paths = small_corpus
+    steps_only = StressTestAnalyzer(root, metric_sets=['steps'])
+    checkpoint = AnalysisCheckpoint(tmp_path / 'ck', steps_only._cache_version)
+    checkpoint.record(paths[0], steps_only.analyze_file(paths[0]))
+    follower = steps_only.follow(paths[1])
+    follower.poll(max_bytes=paths[1].stat().st_size // 2)
+    checkpoint.save_progress(paths[1], follower.consumed, steps_only._state_to_json(follower.metrics))
+    checkpoint._log.close()
+
+    resumed = StressTestAnalyzer(root)
+    resumed.analyze_all_files(checkpoint_dir=tmp_path / 'ck')
+    assert 'Resuming' not in capsys.readouterr().out
+    fresh = StressTestAnalyzer(root)
+    fresh.analyze_all_files()
+    assert _records(resumed) == _records(fresh)
+
+
+def test_checkpointed_run_is_instrumented(small_corpus, tmp_path):
+    root, paths = small_corpus
+    plain = StressTestAnalyzer(root, instrument=True)
+    plain.analyze_all_files()
+    checkpointed = StressTestAnalyzer(root, instrument=True)
+    checkpointed.analyze_all_files(checkpoint_dir=tmp_path / 'ck')
+    counters = ('file_path', 'bytes_read', 'lines_read', 'lines_skipped', 'records')
+    assert [{key: stats[key] for key in counters} for stats in checkpointed.file_stats] == \
+           [{key: stats[key] for key in counters} for stats in plain.file_stats]
+    assert len(checkpointed.file_stats) == len(paths)
+
+
+def test_reanalyzing_a_configuration_replaces_its_runs(corpus):
+    once = StressTestAnalyzer(corpus)
+    once.analyze_all_files()
+    again = StressTestAnalyzer(corpus)
+    again.analyze_all_files()
+    again.analyze_all_files(only=['EasyMap/TwoAgents'])
+    again.analyze_all_files(only=['EasyMap/TwoAgents'])
+    assert len(again.results['Easy Complexity']['Two Agents']) == 2
+    assert again._run_count == once._run_count
+    key = lambda row: (row['complexity'], row['agent_count'])
+    assert sorted(again.calculate_aggregate_metrics(), key=key) == sorted(once.calculate_aggregate_metrics(), key=key)
+    assert sorted(again.run_table()['file_path']) == sorted(once.run_table()['file_path'])
+
+
+def test_running_stats_merge_matches_numpy():
+    np = pytest.importorskip('numpy')
+    values = np.random.default_rng(0).normal(50, 12, 1000)
+    parts = []
+    for chunk in np.array_split(values, [0, 1, 300, 301, 750]):
+        stats = RunningStats()
+        for value in chunk:
+            stats.add(float(value))
+        parts.append(stats)
+    merged = RunningStats()
+    for stats in parts:
+        merged.merge(stats)
+    assert merged.count == len(values)
+    assert merged.mean == pytest.approx(np.mean(values), rel=1e-12)
+    assert merged.std == pytest.approx(np.std(values), rel=1e-12)
+
+
+def test_save_detailed_results_returns_dataframe(corpus, tmp_path):
+    pd = pytest.importorskip('pandas')
+    analyzer = StressTestAnalyzer(corpus)
+    analyzer.analyze_all_files()
+    df = analyzer.save_detailed_results(tmp_path / 'out.csv')
+    assert isinstance(df, pd.DataFrame)
+    assert df.to_dict('records') == analyzer.calculate_aggregate_metrics()
+    assert pd.read_csv(tmp_path / 'out.csv')['num_runs'].tolist() == df['num_runs'].tolist()
+
+
+def test_close_releases_sink_and_cache(corpus, tmp_path):
+    import sqlite3
+    analyzer = StressTestAnalyzer(corpus, cache_dir=tmp_path / 'cache', events_path=tmp_path / 'events.sqlite')
+    analyzer.analyze_all_files(only=['EasyMap/TwoAgents'])
+    sink = analyzer.event_sink
+    analyzer.close()
+    for conn in (sink.conn, analyzer.cache.conn):
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute('SELECT 1')
+    assert analyzer.event_sink is not sink
+    assert list(analyzer.event_sink.read())
+    analyzer.close()
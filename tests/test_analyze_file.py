@@ -0,0 +1,155 @@
+import json
+from collections import Counter, defaultdict
+
+import pytest
+
+from stress_test_analysis import JSON_BACKENDS, StressTestAnalyzer, get_decoder
+from synthetic_logs import write_scenario
+
+AGENT = {'name': 'Alpha', 'entity_id': 1, 'role': 'medic'}
+BRAVO = {'name': 'Bravo', 'entity_id': 2, 'role': 'scout'}
+
+# Hand-written records covering every parsed_response shape the analyzer handles.
+EDGE_RECORDS = [
+    {'time': 1, 'world_state': {'total rescues': 1, 'room_descriptions': ['lobby', 'hall']}},
+    {'time': 1, 'agent': AGENT, 'command': 'move hall', 'parsed_response': json.dumps({'move': 'hall'})},
+    {'time': 1, 'agent': BRAVO, 'command': 'move lab', 'parsed_response': json.dumps({'move': {'move': 'lab'}})},
+    {'time': 2, 'agent': BRAVO, 'command': 'move lab', 'parsed_response': json.dumps({'move': {'room': 'lab'}})},
+    {'time': 2, 'agent': AGENT, 'parsed_response': json.dumps({'communicate': ['Bravo', 'Charlie']})},
+    {'time': 2, 'agent': BRAVO, 'parsed_response': json.dumps({'communicate': 'Alpha', 'move': 'hall'})},
+    {'time': 3, 'agent': AGENT, 'parsed_response': {'communicate': ['Bravo'], 'move': 'lobby'}},
+    {'time': 3, 'agent': AGENT, 'parsed_response': 'not json {'},
+    {'time': 3, 'action_result': {'success': True, 'reason': 'communicate delivered'}},
+    {'time': 3, 'action_result': {'success': False, 'reason': 'communication failed'}},
+    {'time': 4, 'world_state': {'total rescues': 2, 'room_descriptions': ['lab']}},
+]
+
+
+def _reference_metrics(path):
+    """The counts analyze_file derives from parsed_response, recomputed naively with the stdlib decoder.
+
+    Every branch decodes parsed_response on its own, as the analyzer did
+    before it decoded each payload once.
+    """
+    visits = defaultdict(Counter)
+    interactions = Counter()
+    steps = Counter()
+    attempts = 0
+    with open(path) as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            agent = rec.get('agent')
+            name = agent['name'] if isinstance(agent, dict) else None
+            if name and 'command' in rec:
+                steps[name] += 1
+            if 'parsed_response' not in rec:
+                continue
+
+            def decode():
+                raw = rec['parsed_response']
+                try:
+                    return json.loads(raw) if isinstance(raw, str) else raw
+                except json.JSONDecodeError:
+                    return {}
+
+            loc = decode().get('move')
+            if isinstance(loc, dict):
+                loc = loc.get('move') or next(iter(loc.values()), None)
+            if name and isinstance(loc, str):
+                visits[name][loc] += 1
+            if 'communicate' in decode():
+                attempts += 1
+                targets = decode()['communicate']
+                for target in targets if isinstance(targets, list) else [targets]:
+                    interactions[f"{agent['role']}->{target}"] += 1
+    return {
+        'agent_steps': dict(steps),
+        'agent_visits': {agent: dict(rooms) for agent, rooms in visits.items()},
+        'agent_interactions': dict(interactions),
+        'communication_attempts': attempts,
+    }
+
+
+def _installed_backends():
+    backends = []
+    for name in JSON_BACKENDS:
+        try:
+            get_decoder(name)
+        except ImportError:
+            continue
+        backends.append(name)
+    return backends
+
+
+@pytest.fixture
+def edge_log(tmp_path):
+    path = tmp_path / 'edge.json'
+    with open(path, 'w') as f:
+        for record in EDGE_RECORDS:
+            f.write(json.dumps(record) + '\n')
+        f.write('{"time": 5, "truncated\n')
+    return path
+
+
+@pytest.fixture
+def generated_log(tmp_path):
+    path = tmp_path / 'scenario.json'
+    write_scenario(path, 'MediumMap', agents=4, steps=300, malformed_rate=0.01, seed=7)
+    return path
+
+
+@pytest.mark.parametrize('log', ['edge_log', 'generated_log'])
+@pytest.mark.parametrize('backend', _installed_backends())
+def test_metrics_match_reference(request, log, backend):
+    path = request.getfixturevalue(log)
+    metrics = StressTestAnalyzer(json_backend=backend).analyze_file(path)
+    reference = _reference_metrics(path)
+    assert {key: metrics[key] for key in reference} == reference
+
+
+@pytest.mark.parametrize('backend', _installed_backends())
+def test_backends_agree(generated_log, backend):
+    baseline = StressTestAnalyzer(json_backend='json').analyze_file(generated_log)
+    metrics = StressTestAnalyzer(json_backend=backend).analyze_file(generated_log)
+    baseline['unique_rooms_visited'] = sorted(baseline['unique_rooms_visited'])
+    metrics['unique_rooms_visited'] = sorted(metrics['unique_rooms_visited'])
+    assert metrics == baseline
+
+
+def test_edge_log_counts(edge_log):
+    metrics = StressTestAnalyzer().analyze_file(edge_log)
+    assert metrics['agent_visits'] == {'Alpha': {'hall': 1, 'lobby': 1}, 'Bravo': {'lab': 2, 'hall': 1}}
+    assert metrics['communication_attempts'] == 3
+    assert metrics['communication_successes'] == 1
+    assert metrics['communication_failures'] == 1
+    assert metrics['total_rescues'] == 2
+    assert metrics['total_steps'] == 4
+
+
+@pytest.mark.parametrize('instrument', [False, True])
+def test_missing_file_returns_none(tmp_path, capsys, instrument):
+    analyzer = StressTestAnalyzer(instrument=instrument)
+    assert analyzer.analyze_file(tmp_path / 'missing.json') is None
+    assert 'Error processing file' in capsys.readouterr().out
+    assert analyzer.file_stats == []
+
+
+@pytest.mark.parametrize('instrument', [False, True])
+@pytest.mark.parametrize('chunk_size', [4096, 65536])
+def test_chunked_matches_serial(generated_log, chunk_size, instrument):
+    serial = StressTestAnalyzer(instrument=instrument)
+    expected = serial.analyze_file(generated_log)
+    chunked = StressTestAnalyzer(chunk_size=chunk_size, chunk_workers=2, instrument=instrument)
+    assert chunked._should_split(generated_log)
+    metrics = chunked.analyze_file(generated_log)
+    expected['unique_rooms_visited'] = sorted(expected['unique_rooms_visited'])
+    metrics['unique_rooms_visited'] = sorted(metrics['unique_rooms_visited'])
+    assert metrics == expected
+    if instrument:
+        [stats] = chunked.file_stats
+        assert stats['chunks'] > 1
+        for key in ('bytes_read', 'lines_read', 'lines_skipped', 'records'):
+            assert stats[key] == serial.file_stats[0][key]
@@ -0,0 +1,55 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from synthetic_logs import generate_corpus
+
+SCRIPT_DIR = Path(__file__).resolve().parent.parent / 'pythonScript'
+
+
+@pytest.fixture(scope='module')
+def one_file_corpus(tmp_path_factory):
+    root = tmp_path_factory.mktemp('one')
+    generate_corpus(root, complexities=('EasyMap',), agent_counts=(2,), runs=1, steps=50)
+    return root
+
+
+def _run_main(argv, check_modules=()):
+    code = (f"import sys; import stress_test_analysis as s; s.main({argv!r}); "
+            f"print([m for m in {list(check_modules)!r} if m in sys.modules])")
+    proc = subprocess.run([sys.executable, '-c', code], cwd=SCRIPT_DIR, check=True, capture_output=True, text=True)
+    return proc.stdout.splitlines()[-1]
+
+
+def test_csv_run_skips_numpy_and_pandas(one_file_corpus, tmp_path):
+    loaded = _run_main([str(one_file_corpus), '-o', str(tmp_path / 'out.csv')], ('numpy', 'pandas'))
+    assert loaded == '[]'
+    assert (tmp_path / 'out.csv').read_text().startswith('complexity,agent_count,num_runs,')
+
+
+@pytest.mark.parametrize('name, argv, expected', [
+    ('out.json', [], 'json'),
+    ('out.parquet', [], 'parquet'),
+    ('out.csv', [], 'csv'),
+    ('out.txt', ['--format', 'json'], 'json'),
+])
+def test_output_format_follows_extension(one_file_corpus, tmp_path, name, argv, expected):
+    if expected == 'parquet':
+        pytest.importorskip('pyarrow')
+    output = tmp_path / name
+    _run_main([str(one_file_corpus), '-o', str(output), *argv])
+    data = output.read_bytes()
+    if expected == 'json':
+        assert data.startswith(b'[')
+    elif expected == 'parquet':
+        assert data.startswith(b'PAR1')
+    else:
+        assert data.startswith(b'complexity,')
+
+
+def test_default_output_name(one_file_corpus, tmp_path):
+    subprocess.run([sys.executable, str(SCRIPT_DIR / 'stress-analyze'), str(one_file_corpus)], cwd=tmp_path,
+                   check=True, capture_output=True)
+    assert (tmp_path / 'detailed_results.csv').exists()